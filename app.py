@@ -1,16 +1,26 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, bindparam, event
+from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import json
 import datetime
+import functools
+import io
 import os
 from src.database.staging_db import StagingDatabase, DataValidator
 from src.database.permanent_db import PermanentDatabase
 from src.external_data.data_collector import OrcidClient, PubMedCollector
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
 import re
+from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Skapa datakataloger om de inte finns
 os.makedirs("data", exist_ok=True)
@@ -21,6 +31,81 @@ config_dir = "config"
 if os.path.exists(os.path.join(config_dir, "validation_rules.json")):
     validator.load_validation_rules(os.path.join(config_dir, "validation_rules.json"))
 
+@contextmanager
+def txn(eng):
+    """Kör en logisk operation i en transaktion: commit vid lyckat block, rollback vid fel."""
+    with eng.begin() as conn:
+        yield conn
+
+def _sqlite_engine(path):
+    """SQLite-engine med en enda anslutning som hålls varm mellan omritningar.
+    
+    QueuePool med plats för en anslutning gör att sessionerna turas om: en utcheckning
+    väntar tills föregående är återlämnad, så en session kan inte rulla tillbaka en
+    annan sessions öppna transaktion (vilket StaticPool:s delade anslutning tillät).
+    """
+    eng = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=1, max_overflow=0,
+                        connect_args={"check_same_thread": False, "timeout": 30})
+    
+    @event.listens_for(eng, "connect")
+    def _set_pragmas(dbapi_conn, connection_record):
+        # WAL låter läsningar och skrivningar gå parallellt; gäller varje ny anslutning
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+    
+    return eng
+
+@st.cache_resource
+def _cache_engine():
+    """Diskcache för svar från externa API:er så att de överlever omstarter och sessioner."""
+    # Vanlig pool (inte StaticPool) eftersom cachen läses och skrivs från flera trådar
+    eng = create_engine("sqlite:///./data/api_cache.db")
+    with txn(eng) as conn:
+        # Tolkade Scholar-profiler
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS scholar_cache (
+                namn TEXT NOT NULL,
+                orcid TEXT NOT NULL,
+                result TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (namn, orcid)
+            )
+        """))
+        # Råa sökresultat från ORCID och PubMed, nycklade på API-version + fråga
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS kv_cache (
+                query TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """))
+    return eng
+
+API_CACHE_TTL = datetime.timedelta(days=1)
+
+def _kv_cached(key, fetch, ttl=API_CACHE_TTL):
+    """Returnera svaret för key från kv_cache om det är färskt, annars kör fetch() och spara det.
+    
+    Tomma svar sparas inte eftersom de kan bero på tillfälliga fel eller rate-limiting.
+    """
+    eng = _cache_engine()
+    with eng.connect() as conn:
+        row = conn.execute(text("SELECT response, fetched_at FROM kv_cache WHERE query = :query"), {'query': key}).first()
+    if row and time.time() - row.fetched_at < ttl.total_seconds():
+        return json.loads(row.response)
+    
+    response = fetch()
+    if response:
+        with txn(eng) as conn:
+            conn.execute(text("""
+                INSERT OR REPLACE INTO kv_cache (query, response, fetched_at)
+                VALUES (:query, :response, :fetched_at)
+            """), {'query': key, 'response': json.dumps(response), 'fetched_at': time.time()})
+    return response
+
 # Lägg till cache-dekorator för att förhindra upprepade initialiseringar
 @st.cache_resource
 def init_db_connections():
@@ -30,8 +115,8 @@ def init_db_connections():
         permanent_db = PermanentDatabase(db_path="./data/permanent.db")
         
         # Skapa SQLAlchemy-kopplingar för direkta SQL-frågor
-        staging_engine = create_engine(f"sqlite:///./data/staging.db")
-        permanent_engine = create_engine(f"sqlite:///./data/permanent.db")
+        staging_engine = _sqlite_engine("./data/staging.db")
+        permanent_engine = _sqlite_engine("./data/permanent.db")
         
         # Skapa också ORCID och PubMed-klienter här så de inte återskapas hela tiden
         orcid_client = OrcidClient()
@@ -49,8 +134,8 @@ staging_db, permanent_db, staging_engine, permanent_engine, orcid_client, pubmed
 if 'selected_researcher_id' not in st.session_state:
     st.session_state['selected_researcher_id'] = None
 
-if 'pubmed_results' not in st.session_state:
-    st.session_state['pubmed_results'] = []
+if 'pubmed_results_df' not in st.session_state:
+    st.session_state['pubmed_results_df'] = None
 
 if 'current_view' not in st.session_state:
     st.session_state['current_view'] = "search"
@@ -68,8 +153,8 @@ def initialize_session_state():
     if 'selected_researcher_id' not in st.session_state:
         st.session_state['selected_researcher_id'] = None
 
-    if 'pubmed_results' not in st.session_state:
-        st.session_state['pubmed_results'] = []
+    if 'pubmed_results_df' not in st.session_state:
+        st.session_state['pubmed_results_df'] = None
 
     if 'current_view' not in st.session_state:
         st.session_state['current_view'] = "search"
@@ -81,20 +166,100 @@ def initialize_session_state():
         st.session_state.last_orcid_search = ""
         st.session_state.last_orcid_max_results = 10
 
+# Cachade statistikfrågor. Skrivningar anropar _clear_permanent_stats() respektive
+# _bump_staging_ver() så att siffrorna inte blir gamla; ttl fångar övriga ändringar.
+@st.cache_data(ttl=60, show_spinner=False)
+def _count_permanent():
+    with permanent_engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM forskare_permanent")).scalar() or 0
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _count_staging():
+    with staging_engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM forskare_cleanup")).scalar() or 0
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _count_permanent_orcid():
+    with permanent_engine.connect() as conn:
+        return conn.execute(text("""
+        SELECT COUNT(*) FROM forskare_permanent 
+        WHERE orcid IS NOT NULL AND orcid != ''
+        """)).scalar() or 0
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _recent_permanent(limit=10):
+    return pd.read_sql(text("""
+    SELECT * FROM forskare_permanent 
+    ORDER BY created_date DESC 
+    LIMIT :limit
+    """), permanent_engine, params={'limit': limit})
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _institution_stats():
+    # Räkna antal forskare per institution
+    return pd.read_sql("""
+    SELECT institution, COUNT(*) as antal
+    FROM forskare_permanent
+    GROUP BY institution
+    ORDER BY antal DESC
+    LIMIT 10
+    """, permanent_engine)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _orcid_stats():
+    # Antal med ORCID vs utan
+    return pd.read_sql("""
+    SELECT 
+        CASE 
+            WHEN orcid IS NOT NULL AND orcid != '' THEN 'Har ORCID' 
+            ELSE 'Saknar ORCID' 
+        END as orcid_status,
+        COUNT(*) as antal
+    FROM forskare_permanent
+    GROUP BY orcid_status
+    """, permanent_engine)
+
+def _attach_staging(conn):
+    """Koppla in arbetsytans databas som 'staging' på anslutningen om den inte redan är inkopplad."""
+    attached = {row[1] for row in conn.execute(text("PRAGMA database_list"))}
+    if 'staging' not in attached:
+        conn.execute(text("ATTACH DATABASE :path AS staging"), {'path': "./data/staging.db"})
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _start_metrics():
+    """Startsidans tre nyckeltal i en enda fråga över båda databaserna."""
+    with permanent_engine.connect() as conn:
+        # Anslutningen kan ha ersatts sedan förra gången, så kontrollen görs vid varje körning
+        _attach_staging(conn)
+        antal, antal_arbetsyta = conn.execute(text("""
+        SELECT (SELECT COUNT(*) FROM forskare_permanent),
+               (SELECT COUNT(*) FROM staging.forskare_cleanup)
+        """)).one()
+        # forskare_profiler skapas först vid den första sparade profilen
+        senast = None
+        if conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'forskare_profiler'")).first():
+            senast = conn.execute(text("SELECT MAX(last_updated) FROM forskare_profiler")).scalar()
+    return antal or 0, antal_arbetsyta or 0, senast or "Aldrig"
+
+def _clear_permanent_stats():
+    """Invalidera de cachade frågorna mot permanenta databasen efter en skrivning."""
+    for fn in (_count_permanent, _count_permanent_orcid,
+               _recent_permanent, _institution_stats, _orcid_stats, _start_metrics):
+        fn.clear()
+
 def show_database_statistics():
     """Visa statistik om databasen i sidomenyn."""
     try:
         # Räkna antal forskare i permanent databas
-        perm_count_query = "SELECT COUNT(*) as antal FROM forskare_permanent"
         try:
-            perm_count = pd.read_sql(perm_count_query, permanent_engine).iloc[0]['antal']
+            perm_count = _count_permanent()
         except:
             perm_count = 0
             
         # Räkna antal forskare i arbetsyta
-        staging_count_query = "SELECT COUNT(*) as antal FROM forskare_cleanup"
         try:
-            staging_count = pd.read_sql(staging_count_query, staging_engine).iloc[0]['antal']
+            staging_count = _count_staging()
         except:
             staging_count = 0
             
@@ -104,12 +269,8 @@ def show_database_statistics():
         st.markdown(f"**Forskare i arbetsyta:** {staging_count}")
         
         # Visa ORCID-statistik
-        orcid_query = """
-        SELECT COUNT(*) as antal FROM forskare_permanent 
-        WHERE orcid IS NOT NULL AND orcid != ''
-        """
         try:
-            orcid_count = pd.read_sql(orcid_query, permanent_engine).iloc[0]['antal']
+            orcid_count = _count_permanent_orcid()
             orcid_percent = (orcid_count / perm_count * 100) if perm_count > 0 else 0
             st.markdown(f"**Med ORCID:** {orcid_count} ({orcid_percent:.1f}%)")
         except:
@@ -137,13 +298,8 @@ def show_recently_added_researchers():
     """Visa de senast tillagda forskarna från permanenta databasen."""
     try:
         # Hämta de 10 senast tillagda forskarna
-        recent_query = """
-        SELECT * FROM forskare_permanent 
-        ORDER BY created_date DESC 
-        LIMIT 10
-        """
         try:
-            recent_df = pd.read_sql(recent_query, permanent_engine)
+            recent_df = _recent_permanent(10)
             
             if recent_df.empty:
                 st.info("Inga forskare i databasen ännu.")
@@ -173,16 +329,26 @@ def show_recently_added_researchers():
     except Exception as e:
         st.error(f"Fel vid visning av senaste forskare: {str(e)}")
 
-def process_excel_file(uploaded_file):
-    """Processera en uppladdad Excel-fil och extrahera forskare."""
+def process_excel_file(file_bytes):
+    """Processera en uppladdad Excel-fil och extrahera forskare.
+    
+    Tolkningen av filen cachas på innehållet (_parse_excel_file). ORCID-uppslagen för
+    rader som saknar ORCID görs utanför cachen, så att ett misslyckat uppslag inte
+    följer med filen till nästa försök.
+    """
+    success, message, processed_data = _parse_excel_file(file_bytes)
+    for researcher in processed_data:
+        # Om ORCID saknas men vi har namn och institution, försök hitta ORCID
+        if not researcher.get('orcid') and researcher.get('institution'):
+            orcid = search_orcid(researcher['namn'], researcher['efternamn'], researcher['institution'])
+            if orcid:
+                researcher['orcid'] = orcid
+    return success, message, processed_data
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _parse_excel_file(file_bytes):
+    """Tolka en Excel-fil till forskare, utan nätverksanrop. Tar filens innehåll som bytes."""
     try:
-        # Läs Excel-filen
-        df = pd.read_excel(uploaded_file)
-        
-        # Skapa tomma listor för att lagra resultat
-        processed_data = []
-        skipped_records = []
-        
         # Identifiera kolumnnamn i filen
         column_mappings = {
             'namn': ['namn', 'förnamn', 'fornamn', 'name', 'given_name', 'first_name', 'firstname'],
@@ -192,6 +358,21 @@ def process_excel_file(uploaded_file):
             'email': ['email', 'e-post', 'epost', 'e-mail', 'mail'],
             'pmid': ['pmid', 'pubmed', 'pubmed_id']
         }
+        known_columns = {col for cols in column_mappings.values() for col in cols}
+        
+        # Läs Excel-filen, bara de kolumner vi känner igen och allt som text
+        # så att pandas slipper typgissa (och ORCID/PMID inte blir tal)
+        # calamine (Rust) är betydligt snabbare än openpyxl; faller tillbaka om det inte är installerat
+        read_args = dict(dtype=str, usecols=lambda col: col in known_columns)
+        try:
+            df = pd.read_excel(io.BytesIO(file_bytes), engine='calamine', **read_args)
+        except (ImportError, ValueError):
+            # ValueError: pandas äldre än 2.2 känner inte till calamine
+            df = pd.read_excel(io.BytesIO(file_bytes), **read_args)
+        
+        # Skapa tomma listor för att lagra resultat
+        processed_data = []
+        skipped_records = []
         
         # Mappa kolumner från Excel-filen till våra standardkolumner
         actual_columns = {}
@@ -221,12 +402,6 @@ def process_excel_file(uploaded_file):
             
             # Kontrollera att nödvändiga fält finns
             if researcher.get('namn') and researcher.get('efternamn'):
-                # Om ORCID saknas men vi har namn och institution, försök hitta ORCID
-                if not researcher.get('orcid') and researcher.get('institution'):
-                    orcid = search_orcid(researcher['namn'], researcher['efternamn'], researcher['institution'])
-                    if orcid:
-                        researcher['orcid'] = orcid
-                
                 processed_data.append(researcher)
             else:
                 skipped_records.append(f"Rad {index+2}: Saknar namn eller efternamn")
@@ -245,9 +420,9 @@ def process_excel_file(uploaded_file):
 def search_orcid(firstname, lastname, institution):
     """Sök efter ORCID för en forskare baserat på namn och institution."""
     try:
-        # Använd OrcidClient för att söka efter forskaren
+        # Använd OrcidClient för att söka efter forskaren, via diskcachen (bara träffar sparas)
         query = f"{firstname} {lastname} {institution}"
-        researchers = orcid_client.search_researchers(query, max_results=1)
+        researchers = _orcid_search_raw(query, max_results=1)
         
         if researchers and len(researchers) > 0:
             return researchers[0].get('orcid_id', '')
@@ -258,34 +433,152 @@ def search_orcid(firstname, lastname, institution):
         st.warning(f"Kunde inte söka efter ORCID: {str(e)}")
         return ""
 
+# Kolumner som sparas i arbetsytan
+STAGING_COLUMNS = ['namn', 'efternamn', 'orcid', 'institution', 'email', 'notes', 'pmid']
+
+# Uppdatering av en forskare i arbetsytan (rowid), kompileras en gång och återanvänds
+_UPDATE_STAGING_RESEARCHER = text("""
+    UPDATE forskare_cleanup
+    SET namn = :namn,
+        efternamn = :efternamn,
+        institution = :institution,
+        email = :email,
+        orcid = :orcid,
+        notes = :notes
+    WHERE rowid = :rid
+""")
+
+def import_dataframe_to_staging(df):
+    """Lägg in en DataFrame med forskare i arbetsytan med flerradiga INSERT i omgångar."""
+    _init_staging()
+    # Alla arbetsytans kolumner som finns i filen, inklusive pmid från process_excel_file
+    columns = [col for col in STAGING_COLUMNS if col in df.columns]
+    # SQLite tillåter högst 999 parametrar per sats, så antalet rader per INSERT
+    # anpassas efter hur många kolumner som skickas med
+    df[columns].to_sql('forskare_cleanup', con=staging_engine, if_exists='append', index=False,
+                       method='multi', chunksize=max(1, 999 // len(columns)))
+    _bump_staging_ver()
+    return len(df)
+
 def save_to_database(researchers, engine=None, table="forskare_cleanup", permanent=False):
     """Spara forskare till databasen."""
     try:
-        # Konvertera till DataFrame
-        df = pd.DataFrame(researchers)
-        
         if permanent:
             # Spara till permanent databas
-            permanent_db.store_dataframe(df, table, source="app_import")
+            permanent_db.store_dataframe(pd.DataFrame(researchers), table, source="app_import")
+            _clear_permanent_stats()
         else:
-            # Spara direkt till databasen så att det hamnar i rätt tabell
-            # Ändrat från staging_db.store_dataframe(df, table, schema_name="forskare")
-            # som skapade fel med att tabellnamn och schema inte matchade
-            df.to_sql(table, staging_engine, if_exists='append', index=False)
-            st.success(f"Sparat {len(df)} forskare i arbetsytan")
+            # Spara direkt till databasen så att det hamnar i rätt tabell, alla rader
+            # med en executemany i en transaktion. Saknade fält sparas som NULL.
+            _init_staging()
+            rows = [{col: researcher.get(col) for col in STAGING_COLUMNS} for researcher in researchers]
+            with txn(staging_engine) as conn:
+                conn.execute(text(f"""
+                INSERT INTO {table} ({', '.join(STAGING_COLUMNS)})
+                VALUES ({', '.join(':' + col for col in STAGING_COLUMNS)})
+                """), rows)
+            _bump_staging_ver()
+            st.success(f"Sparat {len(rows)} forskare i arbetsytan")
         
         return True
     except Exception as e:
         st.error(f"Fel vid spara till databas: {str(e)}")
         return False
 
+def _orcid_search_raw(search_term, max_results=10):
+    """Råa sökresultat från ORCID, via diskcachen."""
+    return _kv_cached(
+        f"orcid:{orcid_client.base_url}:search:{max_results}:{search_term}",
+        lambda: orcid_client.search_researchers(search_term, max_results))
+
+def _format_orcid_results(researchers):
+    """Anpassa ORCID-sökresultat till arbetsytans format (namn, efternamn, institution, orcid)."""
+    formatted_researchers = []
+    for researcher in researchers:
+        # Robust extrahering av identifierare
+        orcid_id = researcher.get('orcid_id', researcher.get('orcid', ''))
+        
+        # Extrahera namn på flera möjliga sätt
+        given_name = researcher.get('given_name', '')
+        family_name = researcher.get('family_name', '')
+        
+        # Om given_name och family_name saknas, försök dela upp det fullständiga namnet
+        if (not given_name or not family_name) and 'name' in researcher:
+            full_name = researcher.get('name', '')
+            
+            # Dela upp namnet om det innehåller mellanslag
+            name_parts = full_name.split(' ', 1)
+            if len(name_parts) > 1:
+                if not given_name:  # Använd bara om given_name inte redan finns
+                    given_name = name_parts[0]
+                if not family_name:  # Använd bara om family_name inte redan finns
+                    family_name = name_parts[1]
+            else:
+                if not given_name:  # Använd bara om given_name inte redan finns
+                    given_name = full_name
+        
+        # Om vi fortfarande saknar delar av namnet men har display-name
+        if (not given_name or not family_name) and 'display-name' in researcher:
+            display_name = researcher.get('display-name', '')
+            
+            # Dela upp namnet om det innehåller mellanslag
+            name_parts = display_name.split(' ', 1)
+            if len(name_parts) > 1:
+                if not given_name:  # Använd bara om given_name inte redan finns
+                    given_name = name_parts[0]
+                if not family_name:  # Använd bara om family_name inte redan finns
+                    family_name = name_parts[1]
+            else:
+                if not given_name:  # Använd bara om given_name inte redan finns
+                    given_name = display_name
+        
+        # Extrahera institution på flera möjliga sätt
+        institution = ""
+        if 'institution' in researcher:
+            institution = researcher['institution']
+        elif 'affiliation' in researcher:
+            institution = researcher['affiliation']
+        elif 'employments' in researcher and researcher['employments']:
+            if isinstance(researcher['employments'], list) and len(researcher['employments']) > 0:
+                institution = researcher['employments'][0].get('organization', '')
+                
+        # Säkerställ att vi har något att visa
+        if not given_name and not family_name:
+            # Försök med display-name direkt
+            display_name = researcher.get('display-name', '')
+            if display_name:
+                name_parts = display_name.split(' ', 1)
+                if len(name_parts) > 1:
+                    given_name = name_parts[0]
+                    family_name = name_parts[1]
+                else:
+                    given_name = display_name
+                    family_name = ""
+            else:
+                given_name = "Okänt"
+                family_name = "namn"
+        
+        researcher_data = {
+            'orcid': orcid_id,
+            'namn': given_name,
+            'efternamn': family_name,
+            'institution': institution
+        }
+        
+        formatted_researchers.append(researcher_data)
+    
+    # Sortera resultatet efter efternamn
+    formatted_researchers.sort(key=lambda x: x['efternamn'])
+            
+    return formatted_researchers
+
 def search_orcid_researchers(search_term, max_results=10):
     """Sök efter forskare i ORCID API och returnera grundläggande information."""
     try:
         st.info(f"Söker efter forskare med term: '{search_term}'")
         
         # Använd OrcidClient istället för direkt API-anrop
-        researchers = orcid_client.search_researchers(search_term, max_results)
+        researchers = _orcid_search_raw(search_term, max_results)
         
         if not researchers:
             st.info("Inga forskare hittades")
@@ -300,84 +593,7 @@ def search_orcid_researchers(search_term, max_results=10):
         st.success(f"Hittade {len(researchers)} forskare i ORCID")
                     
         # Anpassa formatet av resultatet för att matcha det som förväntas av resten av applikationen
-        formatted_researchers = []
-        for researcher in researchers:
-            # Robust extrahering av identifierare
-            orcid_id = researcher.get('orcid_id', researcher.get('orcid', ''))
-            
-            # Extrahera namn på flera möjliga sätt
-            given_name = researcher.get('given_name', '')
-            family_name = researcher.get('family_name', '')
-            
-            # Om given_name och family_name saknas, försök dela upp det fullständiga namnet
-            if (not given_name or not family_name) and 'name' in researcher:
-                full_name = researcher.get('name', '')
-                
-                # Dela upp namnet om det innehåller mellanslag
-                name_parts = full_name.split(' ', 1)
-                if len(name_parts) > 1:
-                    if not given_name:  # Använd bara om given_name inte redan finns
-                        given_name = name_parts[0]
-                    if not family_name:  # Använd bara om family_name inte redan finns
-                        family_name = name_parts[1]
-                else:
-                    if not given_name:  # Använd bara om given_name inte redan finns
-                        given_name = full_name
-            
-            # Om vi fortfarande saknar delar av namnet men har display-name
-            if (not given_name or not family_name) and 'display-name' in researcher:
-                display_name = researcher.get('display-name', '')
-                
-                # Dela upp namnet om det innehåller mellanslag
-                name_parts = display_name.split(' ', 1)
-                if len(name_parts) > 1:
-                    if not given_name:  # Använd bara om given_name inte redan finns
-                        given_name = name_parts[0]
-                    if not family_name:  # Använd bara om family_name inte redan finns
-                        family_name = name_parts[1]
-                else:
-                    if not given_name:  # Använd bara om given_name inte redan finns
-                        given_name = display_name
-            
-            # Extrahera institution på flera möjliga sätt
-            institution = ""
-            if 'institution' in researcher:
-                institution = researcher['institution']
-            elif 'affiliation' in researcher:
-                institution = researcher['affiliation']
-            elif 'employments' in researcher and researcher['employments']:
-                if isinstance(researcher['employments'], list) and len(researcher['employments']) > 0:
-                    institution = researcher['employments'][0].get('organization', '')
-                    
-            # Säkerställ att vi har något att visa
-            if not given_name and not family_name:
-                # Försök med display-name direkt
-                display_name = researcher.get('display-name', '')
-                if display_name:
-                    name_parts = display_name.split(' ', 1)
-                    if len(name_parts) > 1:
-                        given_name = name_parts[0]
-                        family_name = name_parts[1]
-                    else:
-                        given_name = display_name
-                        family_name = ""
-                else:
-                    given_name = "Okänt"
-                    family_name = "namn"
-            
-            researcher_data = {
-                'orcid': orcid_id,
-                'namn': given_name,
-                'efternamn': family_name,
-                'institution': institution
-            }
-            
-            formatted_researchers.append(researcher_data)
-        
-        # Sortera resultatet efter efternamn
-        formatted_researchers.sort(key=lambda x: x['efternamn'])
-                
-        return formatted_researchers
+        return _format_orcid_results(researchers)
         
     except Exception as e:
         st.error(f"Ett fel uppstod vid sökning i ORCID: {str(e)}")
@@ -418,6 +634,22 @@ def get_basic_researcher_info(orcid_id):
         st.warning(traceback.format_exc())  # Visa fullständigt fel för felsökning
         return None
 
+def _nn(value):
+    """Snabb motsvarighet till pd.notna för enskilda värden (NaN är det enda värdet som inte är lika med sig självt)."""
+    return value is not None and value == value
+
+@functools.lru_cache(maxsize=4096)
+def _format_date_parts(year, month, day):
+    """Skapa datumsträng utifrån de komponenter som finns. Cachad eftersom samma år/månader återkommer."""
+    date_str = ""
+    if year:
+        date_str += str(year)
+        if month:
+            date_str += f"-{month}"
+            if day:
+                date_str += f"-{day}"
+    return date_str if date_str else None
+
 def _format_date(date_obj):
     """Formatera ett datumsobjekt från ORCID API till en läsbar sträng."""
     # Hantera None-värden direkt
@@ -436,15 +668,7 @@ def _format_date(date_obj):
         day = date_obj.get('day', {}) if isinstance(date_obj.get('day', {}), dict) else date_obj.get('day')
         day = day.get('value') if isinstance(day, dict) else day
         
-        # Skapa datum utifrån de komponenter som finns
-        date_str = ""
-        if year:
-            date_str += str(year)
-            if month:
-                date_str += f"-{month}"
-                if day:
-                    date_str += f"-{day}"
-        return date_str if date_str else None
+        return _format_date_parts(year, month, day)
         
     elif isinstance(date_obj, str):
         # Om det redan är en sträng, returnera den direkt
@@ -452,6 +676,24 @@ def _format_date(date_obj):
         
     return None
 
+def _nonempty_list(data, key):
+    """Returnera data[key] om det är en icke-tom lista, annars None."""
+    value = data.get(key)
+    return value if isinstance(value, list) and value else None
+
+def _profile_records_df(records, title_key, default_title):
+    """Bygg en tabell (titel, organisation, period) av anställningar, utbildningar eller finansieringar."""
+    rows = []
+    for record in records:
+        start_date = _format_date(record.get('start-date'))
+        end_date = _format_date(record.get('end-date'))
+        rows.append({
+            'Titel': record.get(title_key, default_title),
+            'Organisation': record.get('organization', 'Okänd organisation'),
+            'Period': f"{start_date or '?'} – {end_date or 'nu'}" if start_date or end_date else ''
+        })
+    return pd.DataFrame(rows)
+
 def fetch_complete_orcid_data(orcid: str) -> dict:
     """
     Hämtar komplett data från ORCID API för det angivna ORCID-numret.
@@ -541,7 +783,7 @@ def save_complete_orcid_profile(orcid, engine=None, permanent_db=True):
             profile_table = "forskare_temp_profiler"
         
         # Skapa tabellen om den inte finns
-        with db_engine.connect() as conn:
+        with txn(db_engine) as conn:
             conn.execute(text(f"""
             CREATE TABLE IF NOT EXISTS {profile_table} (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -561,8 +803,6 @@ def save_complete_orcid_profile(orcid, engine=None, permanent_db=True):
             ON CONFLICT(orcid) DO UPDATE SET
             profile_data = :profile_data, last_updated = CURRENT_TIMESTAMP
             """), {'orcid': orcid, 'profile_data': profile_json})
-            
-            conn.commit()
         
         st.success(f"Profil för {person_data.get('given_name', '')} {person_data.get('family_name', '')} sparad!")
         return True, person_data
@@ -573,53 +813,83 @@ def save_complete_orcid_profile(orcid, engine=None, permanent_db=True):
         st.error(traceback.format_exc())
         return False, None
 
-def move_to_permanent_db(researcher_id, engine):
-    """Flytta en forskare från arbetsytan till permanenta databasen."""
+# Kolumner som flyttas från arbetsytan till forskare_permanent
+PERMANENT_COLUMNS = ['namn', 'efternamn', 'orcid', 'institution', 'email', 'notes', 'pmid']
+
+def move_to_permanent_db(researcher_ids, engine):
+    """
+    Flytta valda forskare från arbetsytan till permanenta databasen.
+    
+    Alla rader läses med en fråga, skrivs in med en executemany i en transaktion
+    och tas bort från arbetsytan med en enda DELETE.
+    
+    Returns:
+        Tuple (antal flyttade forskare, lista med felmeddelanden)
+    """
+    ids = [int(i) for i in researcher_ids]
+    if not ids:
+        return 0, []
+    
+    failure_messages = []
     try:
-        # Försök hämta forskaren från arbetsytan med rowid
+        # Hämta alla valda forskare från arbetsytan i en fråga
         try:
-            query = f"SELECT rowid, * FROM forskare_cleanup WHERE rowid = {researcher_id}"
-            researcher_df = pd.read_sql(query, engine)
+            query = text("SELECT rowid AS _rowid, * FROM forskare_cleanup WHERE rowid IN :ids").bindparams(
+                bindparam("ids", expanding=True))
+            researcher_df = pd.read_sql(query, engine, params={"ids": ids})
         except Exception as e:
-            return False, f"Kunde inte hämta forskare med rowid {researcher_id}: {str(e)}"
+            return 0, [f"Kunde inte hämta forskare från arbetsytan: {str(e)}"]
         
-        if len(researcher_df) == 0:
-            return False, "Forskare hittades inte i arbetsytan"
+        found_ids = set(int(i) for i in researcher_df['_rowid'])
+        for researcher_id in ids:
+            if researcher_id not in found_ids:
+                failure_messages.append(f"Forskare {researcher_id} hittades inte i arbetsytan")
         
-        # Kontrollera om forskaren redan finns i permanenta databasen, men bara om ORCID finns
-        orcid = researcher_df.iloc[0]['orcid'] if pd.notna(researcher_df.iloc[0]['orcid']) else None
-        if orcid:
-            try:
-                check_query = f"SELECT * FROM forskare_permanent WHERE orcid = '{orcid}'"
-                existing = pd.read_sql(check_query, permanent_engine)
-                if len(existing) > 0:
-                    return False, f"Forskare med ORCID {orcid} finns redan i permanenta databasen"
-            except Exception as e:
-                # Om tabellen inte finns än, ignorera felet och fortsätt
-                pass
-        
-        # Även om ORCID saknas, kontrollera om namn+efternamn+institution matchar
-        namn = researcher_df.iloc[0]['namn']
-        efternamn = researcher_df.iloc[0]['efternamn']
-        institution = researcher_df.iloc[0]['institution'] if pd.notna(researcher_df.iloc[0]['institution']) else ""
-        
-        if namn and efternamn:
-            try:
-                check_query = f"""
-                SELECT * FROM forskare_permanent 
-                WHERE namn = '{namn}' 
-                AND efternamn = '{efternamn}'
-                AND institution = '{institution}'
-                """
-                existing = pd.read_sql(check_query, permanent_engine)
-                if len(existing) > 0:
-                    return False, f"Forskare med namn {namn} {efternamn} vid {institution} finns redan i permanenta databasen"
-            except Exception as e:
-                # Om tabellen inte finns än, ignorera felet och fortsätt
-                pass
+        # Läs befintliga forskare en gång för dubblettkontrollen
+        existing_orcids = set()
+        existing_names = set()
+        try:
+            existing = pd.read_sql("SELECT namn, efternamn, orcid, institution FROM forskare_permanent", permanent_engine)
+            existing_orcids = set(existing['orcid'].dropna())
+            existing_names = set(zip(existing['namn'], existing['efternamn'], existing['institution'].fillna("")))
+        except Exception as e:
+            # Om tabellen inte finns än, ignorera felet och fortsätt
+            pass
         
-        # Skapa permanenta forskartabellen om den inte finns
-        with permanent_engine.connect() as conn:
+        rows_to_insert = []
+        moved_ids = []
+        moved_orcids = {}
+        for row in researcher_df.to_dict('records'):
+            orcid = row.get('orcid') if _nn(row.get('orcid')) and row.get('orcid') else None
+            namn = row.get('namn')
+            efternamn = row.get('efternamn')
+            institution = row.get('institution') if _nn(row.get('institution')) else ""
+            
+            # Kontrollera om forskaren redan finns i permanenta databasen, men bara om ORCID finns
+            if orcid and orcid in existing_orcids:
+                failure_messages.append(f"Forskare med ORCID {orcid} finns redan i permanenta databasen")
+                continue
+            
+            # Även om ORCID saknas, kontrollera om namn+efternamn+institution matchar
+            if namn and efternamn and (namn, efternamn, institution) in existing_names:
+                failure_messages.append(f"Forskare med namn {namn} {efternamn} vid {institution} finns redan i permanenta databasen")
+                continue
+            
+            # Räkna även med dubbletter inom samma urval
+            if orcid:
+                existing_orcids.add(orcid)
+                moved_orcids[orcid] = f"{namn} {efternamn}"
+            if namn and efternamn:
+                existing_names.add((namn, efternamn, institution))
+            
+            rows_to_insert.append({col: row[col] if col in row and _nn(row[col]) else None for col in PERMANENT_COLUMNS})
+            moved_ids.append(int(row['_rowid']))
+        
+        if not rows_to_insert:
+            return 0, failure_messages
+        
+        # Skapa permanenta forskartabellen om den inte finns och spara alla forskare i en transaktion
+        with txn(permanent_engine) as conn:
             conn.execute(text("""
             CREATE TABLE IF NOT EXISTS forskare_permanent (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -633,89 +903,84 @@ def move_to_permanent_db(researcher_id, engine):
                 created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
             """))
-        
-        # Spara forskaren i permanenta databasen
-        researcher_data = researcher_df.to_dict('records')[0]
-        # Ta bort rowid och id för att låta databasen generera ett nytt id
-        if 'rowid' in researcher_data:
-            del researcher_data['rowid']
-        if 'id' in researcher_data:
-            del researcher_data['id']
-            
-        # Lägg till i permanenta databasen via pandas
-        pd.DataFrame([researcher_data]).to_sql("forskare_permanent", permanent_engine, if_exists="append", index=False)
-        
-        # Registrera i permanent_db dataset-tabell
-        dataset_info = {
-            'name': 'forskare_permanent',
-            'source': 'staging_db',
-            'record_count': 1
-        }
-        
-        # Om forskaren har en ORCID, försök hämta komplett profil till permanenta databasen
-        if orcid:
-            try:
-                # Kontrollera om det finns en fullständig profil i arbetsytan
-                temp_profile_query = f"SELECT * FROM forskare_temp_profiler WHERE orcid = '{orcid}'"
-                temp_profile_exists = False
-                temp_profile_data = None
-                
-                try:
-                    temp_profile_df = pd.read_sql(temp_profile_query, staging_engine)
-                    if not temp_profile_df.empty:
-                        temp_profile_exists = True
-                        temp_profile_data = json.loads(temp_profile_df.iloc[0]['profile_data'])
-                except Exception as e:
-                    # Ignorera om tabellen inte finns
-                    pass
-                
-                if temp_profile_exists and temp_profile_data:
-                    # Om profilen finns i arbetsytan, kopiera den till permanenta
-                    with permanent_engine.connect() as conn:
-                        conn.execute(text(f"""
-                        CREATE TABLE IF NOT EXISTS forskare_profiler (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            orcid TEXT UNIQUE,
-                            profile_data TEXT,
-                            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                        """))
-                    
-                    # Konvertera till JSON och spara
-                    profile_json = json.dumps(temp_profile_data)
-                    profile_df = pd.DataFrame([{'orcid': orcid, 'profile_data': profile_json}])
-                    profile_df.to_sql("forskare_profiler", permanent_engine, if_exists="append", index=False)
-                else:
-                    # Annars, hämta profilen direkt från ORCID API till permanenta databasen
-                    success, profile_data = save_complete_orcid_profile(orcid, permanent_engine, permanent_db=True)
-                    if not success:
-                        st.warning("Kunde inte hämta komplett ORCID-profil, men forskaren har flyttats")
-                
-                # Registrera ORCID-koppling i permanent_db
-                permanent_db.register_orcid_mapping(
-                    dataset_id=1,  # Vi använder ID 1 för forskare_permanent tabellen
-                    record_id=f"{namn} {efternamn}",
-                    orcid=orcid,
-                    confidence=1.0  # Hög konfidens eftersom användaren manuellt flyttar
-                )
-            except Exception as orcid_error:
-                st.warning(f"Fel vid hantering av ORCID-profil: {str(orcid_error)}, men forskaren har flyttats")
-        
-        # Ta bort från arbetsytan efter att ha flyttat
-        with engine.connect() as conn:
-            conn.execute(text(f"DELETE FROM forskare_cleanup WHERE rowid = {researcher_id}"))
-            conn.commit()
-        
-        return True, "Forskare flyttad till permanenta databasen"
+            conn.execute(text(f"""
+            INSERT INTO forskare_permanent ({', '.join(PERMANENT_COLUMNS)})
+            VALUES ({', '.join(':' + col for col in PERMANENT_COLUMNS)})
+            """), rows_to_insert)
+        
+        # Ta bort från arbetsytan efter att ha flyttat, med en enda DELETE
+        with txn(engine) as conn:
+            conn.execute(text("DELETE FROM forskare_cleanup WHERE rowid IN :ids").bindparams(
+                bindparam("ids", expanding=True)), {"ids": moved_ids})
+        _bump_staging_ver()
+        
+        # Om forskarna har ORCID, försök hämta kompletta profiler till permanenta databasen
+        if moved_orcids:
+            _move_orcid_profiles(moved_orcids)
+        _clear_permanent_stats()
+        
+        return len(moved_ids), failure_messages
     
     except Exception as e:
-        return False, f"Fel vid flytt: {str(e)}"
+        failure_messages.append(f"Fel vid flytt: {str(e)}")
+        return 0, failure_messages
+
+def _move_orcid_profiles(moved_orcids):
+    """Kopiera profiler från arbetsytan (eller hämta dem från ORCID) för flyttade forskare."""
+    # Kontrollera vilka fullständiga profiler som redan finns i arbetsytan
+    temp_profiles = {}
+    try:
+        query = text("SELECT orcid, profile_data FROM forskare_temp_profiler WHERE orcid IN :orcids").bindparams(
+            bindparam("orcids", expanding=True))
+        with staging_engine.connect() as conn:
+            temp_profiles = {orcid: data for orcid, data in conn.execute(query, {"orcids": list(moved_orcids)}) if data}
+    except Exception as e:
+        # Ignorera om tabellen inte finns
+        pass
+    
+    try:
+        if temp_profiles:
+            # Om profilerna finns i arbetsytan, kopiera dem till permanenta
+            with txn(permanent_engine) as conn:
+                conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS forskare_profiler (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    orcid TEXT UNIQUE,
+                    profile_data TEXT,
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """))
+                conn.execute(text("""
+                INSERT INTO forskare_profiler (orcid, profile_data, last_updated)
+                VALUES (:orcid, :profile_data, CURRENT_TIMESTAMP)
+                ON CONFLICT(orcid) DO UPDATE SET
+                profile_data = :profile_data, last_updated = CURRENT_TIMESTAMP
+                """), [{'orcid': orcid, 'profile_data': data} for orcid, data in temp_profiles.items()])
+    except Exception as orcid_error:
+        st.warning(f"Fel vid kopiering av ORCID-profiler: {str(orcid_error)}, men forskarna har flyttats")
+    
+    for orcid in moved_orcids.keys() - temp_profiles.keys():
+        try:
+            # Annars, hämta profilen direkt från ORCID API till permanenta databasen
+            success, profile_data = save_complete_orcid_profile(orcid, permanent_engine, permanent_db=True)
+            if not success:
+                st.warning("Kunde inte hämta komplett ORCID-profil, men forskaren har flyttats")
+        except Exception as orcid_error:
+            st.warning(f"Fel vid hantering av ORCID-profil: {str(orcid_error)}, men forskaren har flyttats")
+    
+    # Registrera alla ORCID-kopplingar i permanent_db i en omgång.
+    # Vi använder ID 1 för forskare_permanent tabellen, och hög konfidens eftersom användaren manuellt flyttar
+    if not permanent_db.register_orcid_mappings_bulk(
+            1, [(record_id, orcid, 1.0) for orcid, record_id in moved_orcids.items()]):
+        st.warning("Kunde inte registrera ORCID-kopplingarna, men forskarna har flyttats")
+
+# ORCID-format, kompilerat en gång
+_ORCID_RE = re.compile(r'\d{4}-\d{4}-\d{4}-\d{3}[\dX]')
 
+@functools.lru_cache(maxsize=1024)
 def validate_orcid(orcid):
-    """Validera ORCID-format."""
-    import re
-    pattern = r'^\d{4}-\d{4}-\d{4}-\d{3}[\dX]$'
-    return bool(re.match(pattern, orcid))
+    """Validera ORCID-format. Resultatet memoiseras så att samma ORCID bara kontrolleras en gång."""
+    return bool(_ORCID_RE.fullmatch(orcid))
 
 def fetch_and_update_orcid_profile(researcher_id, orcid):
     """Hämta och uppdatera ORCID-profil för en forskare."""
@@ -757,7 +1022,7 @@ def fetch_and_update_orcid_profile(researcher_id, orcid):
                     institution = profile_data['employments'][0].get('organization', '')
             
             # Uppdatera existerande forskare med ny information
-            with permanent_engine.connect() as conn:
+            with txn(permanent_engine) as conn:
                 conn.execute(text("""
                 UPDATE forskare_permanent
                 SET email = :email, 
@@ -770,6 +1035,7 @@ def fetch_and_update_orcid_profile(researcher_id, orcid):
                     'notes': biography,
                     'id': researcher_id
                 })
+            _clear_permanent_stats()
             
             st.success(f"Forskarprofil uppdaterad med information från ORCID")
             
@@ -780,6 +1046,28 @@ def fetch_and_update_orcid_profile(researcher_id, orcid):
         st.error(traceback.format_exc())
         return False, None
 
+def _pubmed_search_raw(search_term, max_results=10):
+    """Råa artiklar från PubMed, via diskcachen."""
+    return _kv_cached(
+        f"pubmed:{pubmed_collector.base_url}:search:{max_results}:{search_term}",
+        lambda: pubmed_collector.search_articles(search_term, max_results=max_results))
+
+def _format_pubmed_articles(articles):
+    """Formatera PubMed-artiklar till de kolumner som resultattabellen visar."""
+    publications = []
+    for article in articles:
+        pub = {
+            "title": article.get("title", "Ingen titel"),
+            "authors": article.get("authors", "Okänd"),
+            "journal": article.get("journal", "Okänd journal"),
+            "publication_date": article.get("publication_date", "Okänt datum"),
+            "pmid": article.get("pmid", ""),
+            "abstract": article.get("abstract", "Inget abstract tillgängligt"),
+        }
+        publications.append(pub)
+    
+    return publications
+
 def search_pubmed(search_term=None, max_results=10, researcher=None):
     """
     Sök efter publikationer på PubMed baserat på sökterm eller forskaruppgifter.
@@ -813,7 +1101,7 @@ def search_pubmed(search_term=None, max_results=10, researcher=None):
         st.info(f"Söker efter publikationer med term: {search_term}")
         
         # Använd PubMedCollector för att söka
-        articles = pubmed_collector.search_articles(search_term, max_results=max_results)
+        articles = _pubmed_search_raw(search_term, max_results)
         
         # Om inga resultat, returnera tom lista
         if not articles:
@@ -821,19 +1109,7 @@ def search_pubmed(search_term=None, max_results=10, researcher=None):
             return []
         
         # Formatera publikationerna
-        publications = []
-        for article in articles:
-            pub = {
-                "title": article.get("title", "Ingen titel"),
-                "authors": article.get("authors", "Okänd"),
-                "journal": article.get("journal", "Okänd journal"),
-                "publication_date": article.get("publication_date", "Okänt datum"),
-                "pmid": article.get("pmid", ""),
-                "abstract": article.get("abstract", "Inget abstract tillgängligt"),
-            }
-            publications.append(pub)
-        
-        return publications
+        return _format_pubmed_articles(articles)
     
     except Exception as e:
         st.error(f"Fel vid sökning i PubMed: {str(e)}")
@@ -841,17 +1117,103 @@ def search_pubmed(search_term=None, max_results=10, researcher=None):
         st.error(traceback.format_exc())
         return []
 
+@st.cache_resource
+def _io_pool():
+    """Delad trådpool för sökningar som körs i bakgrunden medan sidan ritas om."""
+    return ThreadPoolExecutor(max_workers=4)
+
+def _orcid_search_job(search_term, max_results=10):
+    """ORCID-sökning utan st-anrop, så att den kan köras i _io_pool."""
+    researchers = _orcid_search_raw(search_term, max_results)
+    return _format_orcid_results(researchers) if isinstance(researchers, list) else []
+
+def _pubmed_search_job(search_term, max_results=20):
+    """PubMed-sökning utan st-anrop, så att den kan köras i _io_pool."""
+    return _format_pubmed_articles(_pubmed_search_raw(search_term, max_results) or [])
+
+class _NoHits(Exception):
+    """Sökningen gav inget; kastas ur de cachade sökningarna så att st.cache_data inte sparar svaret."""
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _search_orcid_cached(search_term, max_results):
+    researchers = _orcid_search_job(search_term, max_results)
+    if not researchers:
+        raise _NoHits
+    return researchers
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _search_pubmed_cached(search_term, max_results):
+    articles = _pubmed_search_job(search_term, max_results)
+    if not articles:
+        raise _NoHits
+    return articles
+
+def _cached_search_orcid(search_term, max_results=10):
+    """Cachad ORCID-sökning så att samma sökning inte formateras om vid varje omritning.
+    
+    Tomma svar cachas inte: klienten ger [] även vid timeout eller 429, och det ska inte
+    se ut som "inga träffar" i ett dygn (samma regel som _kv_cached).
+    """
+    try:
+        return _search_orcid_cached(search_term, max_results)
+    except _NoHits:
+        return []
+    except Exception as e:
+        st.error(f"Ett fel uppstod vid sökning i ORCID: {str(e)}")
+        return []
+
+def _cached_search_pubmed(search_term, max_results=10):
+    """Cachad PubMed-sökning; tomma svar cachas inte, på samma sätt som i _cached_search_orcid."""
+    try:
+        return _search_pubmed_cached(search_term, max_results)
+    except _NoHits:
+        return []
+    except Exception as e:
+        st.error(f"Fel vid sökning i PubMed: {str(e)}")
+        return []
+
+def _finished_job(key):
+    """Plocka ut en färdig bakgrundssökning ur session_state; None om den fortfarande pågår."""
+    future = st.session_state.get(key)
+    if future is None or not future.done():
+        return None
+    del st.session_state[key]
+    return future
+
+@st.fragment(run_every=1)
+def _wait_for_job(key, label):
+    """Visa status för en pågående bakgrundssökning och rita om sidan när den är klar."""
+    future = st.session_state.get(key)
+    if future is None:
+        return
+    if future.done():
+        st.rerun()
+    st.status(label, state="running")
+
+def _article_markdown(article):
+    """Bygg detaljvyn för en publikation (inklusive abstract) som en enda markdown-sträng."""
+    text_md = (
+        f"### {article['title']}\n\n"
+        f"**Författare:** {article['authors']}\n\n"
+        f"**Journal:** {article['journal']}\n\n"
+        f"**Publiceringsdatum:** {article['publication_date']}\n\n"
+        f"**PMID:** [{article['pmid']}](https://pubmed.ncbi.nlm.nih.gov/{article['pmid']}/)"
+    )
+    if 'abstract' in article and _nn(article['abstract']) and article['abstract']:
+        text_md += f"\n\n#### Abstract\n\n{article['abstract']}"
+    return text_md
+
 def perform_researcher_search(search_term):
     """Utför sökning efter forskare och visar resultaten"""
-    query = f"""
+    query = text("""
     SELECT * FROM forskare_permanent
-    WHERE namn LIKE '%{search_term}%'
-    OR efternamn LIKE '%{search_term}%'
-    OR orcid LIKE '%{search_term}%'
-    OR institution LIKE '%{search_term}%'
-    """
+    WHERE namn LIKE :pattern
+    OR efternamn LIKE :pattern
+    OR orcid LIKE :pattern
+    OR institution LIKE :pattern
+    """)
     try:
-        df = pd.read_sql(query, permanent_engine)
+        df = pd.read_sql(query, permanent_engine, params={'pattern': f"%{search_term}%"})
         st.session_state['last_search_results'] = df
         
         if not df.empty:
@@ -868,29 +1230,36 @@ def display_researcher_list(df):
         st.info("Inga forskare att visa.")
         return
         
+    # Fyll i saknade värden en gång för hela tabellen istället för pd.notna per rad
+    rows = df[['id', 'namn', 'efternamn', 'institution']].assign(
+        namn=df['namn'].fillna(''),
+        efternamn=df['efternamn'].fillna(''),
+        institution=df['institution'].fillna("Okänd institution"),
+        har_orcid=df['orcid'].notna()
+    )
+    
     # Skapa en tabell med forskare som kan klickas på
-    for i, row in df.iterrows():
+    for row in rows.itertuples(index=False):
         col1, col2, col3, col4 = st.columns([1, 2, 1.5, 0.5])
         
         with col1:
-            if pd.notna(row['orcid']):
+            if row.har_orcid:
                 st.image("https://orcid.org/sites/default/files/images/orcid_16x16.png", width=16)
             else:
                 st.write("👤")
                 
         with col2:
-            name = f"{row['namn']} {row['efternamn']}".strip()
+            name = f"{row.namn} {row.efternamn}".strip()
             if not name:
                 name = "Okänt namn"
             st.markdown(f"**{name}**")
             
         with col3:
-            institution = row['institution'] if pd.notna(row['institution']) else "Okänd institution"
-            st.write(institution)
+            st.write(row.institution)
             
         with col4:
-            if st.button("Visa", key=f"show_{row['id']}"):
-                st.session_state['selected_researcher_id'] = row['id']
+            if st.button("Visa", key=f"show_{row.id}"):
+                st.session_state['selected_researcher_id'] = row.id
                 st.session_state['current_view'] = "researcher_detail"
                 st.rerun()
         
@@ -907,8 +1276,18 @@ def show_researcher_detail_view():
     researcher_id = st.session_state['selected_researcher_id']
     
     try:
-        researcher_query = f"SELECT * FROM forskare_permanent WHERE id = {researcher_id}"
-        researcher_df = pd.read_sql(researcher_query, permanent_engine)
+        # Hämta forskaren och eventuell sparad ORCID-profil i en och samma fråga
+        researcher_query = text("""
+        SELECT p.*, f.profile_data FROM forskare_permanent p
+        LEFT JOIN forskare_profiler f ON f.orcid = p.orcid
+        WHERE p.id = :id
+        """)
+        try:
+            researcher_df = pd.read_sql(researcher_query, permanent_engine, params={'id': int(researcher_id)})
+        except Exception:
+            # Profiltabellen skapas först när den första profilen sparas
+            researcher_df = pd.read_sql(text("SELECT * FROM forskare_permanent WHERE id = :id"),
+                                        permanent_engine, params={'id': int(researcher_id)})
         
         if researcher_df.empty:
             st.error("Forskaren kunde inte hittas i databasen")
@@ -931,12 +1310,12 @@ def show_researcher_detail_view():
             info_col1, info_col2 = st.columns(2)
             
             with info_col1:
-                st.markdown(f"**Institution:** {researcher['institution'] if pd.notna(researcher['institution']) else 'Ej angiven'}")
-                if pd.notna(researcher['email']):
+                st.markdown(f"**Institution:** {researcher['institution'] if _nn(researcher['institution']) else 'Ej angiven'}")
+                if _nn(researcher['email']):
                     st.markdown(f"**E-post:** {researcher['email']}")
             
             with info_col2:
-                if pd.notna(researcher['orcid']):
+                if _nn(researcher['orcid']):
                     st.markdown(f"**ORCID:** [{researcher['orcid']}](https://orcid.org/{researcher['orcid']})")
             
             # Lägg till knappar för datainhämtning
@@ -944,7 +1323,7 @@ def show_researcher_detail_view():
             with button_col1:
                 # ORCID-uppdatering
                 if st.button("📝 Uppdatera från ORCID", use_container_width=True):
-                    if pd.notna(researcher['orcid']):
+                    if _nn(researcher['orcid']):
                         with st.spinner(f"Hämtar fullständig ORCID-profil..."):
                             success, profile_data = fetch_and_update_orcid_profile(researcher_id, researcher['orcid'])
                             if success:
@@ -970,10 +1349,10 @@ def show_researcher_detail_view():
                     
                     # Utför sökningen direkt
                     full_name = f"{researcher['namn']} {researcher['efternamn']}"
-                    orcid_val = researcher['orcid'] if pd.notna(researcher['orcid']) else None
+                    orcid_val = researcher['orcid'] if _nn(researcher['orcid']) else None
                     
                     with st.spinner(f"Söker efter {full_name} på Google Scholar..."):
-                        scholar_data = search_google_scholar(full_name, orcid=orcid_val)
+                        scholar_data = cached_scholar_search(full_name, orcid=orcid_val)
                         st.session_state['scholar_data'] = scholar_data
                     
                     st.rerun()
@@ -1015,29 +1394,30 @@ def show_researcher_detail_view():
             if scholar_data['coauthors']:
                 st.markdown("### 👥 Medförfattare")
                 
-                # Visa i table_cols kolumner
+                # Visa i table_cols kolumner som en enda markdown-tabell istället för en widget per medförfattare
                 table_cols = 3
-                rows = [scholar_data['coauthors'][i:i+table_cols] for i in range(0, len(scholar_data['coauthors']), table_cols)]
-                
+                coauthors = scholar_data['coauthors']
+                rows = [coauthors[i:i+table_cols] for i in range(0, len(coauthors), table_cols)]
+
+                table_rows = []
                 for row in rows:
-                    cols = st.columns(table_cols)
-                    for i, coauthor in enumerate(row):
-                        with cols[i]:
-                            st.markdown(f"**[{coauthor['name']}]({coauthor['profile_url']})**")
+                    cells = [f"**[{coauthor['name']}]({coauthor['profile_url']})**" for coauthor in row]
+                    cells += [""] * (table_cols - len(cells))
+                    table_rows.append("| " + " | ".join(cells) + " |")
+
+                header = "|" + " |" * table_cols + "\n|" + "---|" * table_cols
+                st.markdown(header + "\n" + "\n".join(table_rows))
         
         # === DETALJERAD INFORMATION - VISA OM DET FINNS PROFIL ===
         has_profile = False
         profile_data = {}
         
-        if pd.notna(researcher['orcid']):
-            # Försök hämta profilen från databasen
+        profile_json = researcher.get('profile_data')
+        if _nn(profile_json):
+            # Profilen hämtades redan tillsammans med forskaren
             try:
-                profile_query = f"SELECT * FROM forskare_profiler WHERE orcid = '{researcher['orcid']}'"
-                profile_df = pd.read_sql(profile_query, permanent_engine)
-                
-                if not profile_df.empty:
-                    has_profile = True
-                    profile_data = json.loads(profile_df.iloc[0]['profile_data'])
+                profile_data = json.loads(profile_json)
+                has_profile = True
             except Exception as e:
                 st.error(f"Kunde inte läsa profildata: {str(e)}")
         
@@ -1050,14 +1430,14 @@ def show_researcher_detail_view():
                 
                 with col1:
                     edit_firstname = st.text_input("Förnamn", value=researcher['namn'])
-                    edit_institution = st.text_input("Institution", value=researcher['institution'] if pd.notna(researcher['institution']) else "")
+                    edit_institution = st.text_input("Institution", value=researcher['institution'] if _nn(researcher['institution']) else "")
                 
                 with col2:
                     edit_lastname = st.text_input("Efternamn", value=researcher['efternamn'])
-                    edit_email = st.text_input("E-post", value=researcher['email'] if pd.notna(researcher['email']) else "")
+                    edit_email = st.text_input("E-post", value=researcher['email'] if _nn(researcher['email']) else "")
                 
-                edit_orcid = st.text_input("ORCID ID", value=researcher['orcid'] if pd.notna(researcher['orcid']) else "")
-                edit_notes = st.text_area("Anteckningar", value=researcher['notes'] if pd.notna(researcher['notes']) else "")
+                edit_orcid = st.text_input("ORCID ID", value=researcher['orcid'] if _nn(researcher['orcid']) else "")
+                edit_notes = st.text_area("Anteckningar", value=researcher['notes'] if _nn(researcher['notes']) else "")
                 
                 # Knapp för att ta bort forskare
                 col1, col2 = st.columns(2)
@@ -1067,20 +1447,28 @@ def show_researcher_detail_view():
                 if submit:
                     try:
                         # Uppdatera i databasen
-                        update_query = f"""
+                        update_query = text("""
                         UPDATE forskare_permanent 
-                        SET namn = '{edit_firstname}', 
-                            efternamn = '{edit_lastname}', 
-                            institution = '{edit_institution}', 
-                            email = '{edit_email}', 
-                            orcid = '{edit_orcid}', 
-                            notes = '{edit_notes}'
-                        WHERE id = {researcher_id}
-                        """
+                        SET namn = :namn, 
+                            efternamn = :efternamn, 
+                            institution = :institution, 
+                            email = :email, 
+                            orcid = :orcid, 
+                            notes = :notes
+                        WHERE id = :id
+                        """)
                         
-                        with permanent_engine.connect() as conn:
-                            conn.execute(text(update_query))
-                            conn.commit()
+                        with txn(permanent_engine) as conn:
+                            conn.execute(update_query, {
+                                'namn': edit_firstname,
+                                'efternamn': edit_lastname,
+                                'institution': edit_institution,
+                                'email': edit_email,
+                                'orcid': edit_orcid,
+                                'notes': edit_notes,
+                                'id': int(researcher_id)
+                            })
+                        _clear_permanent_stats()
                         
                         st.success("Forskarinformation uppdaterad!")
                         st.session_state['edit_researcher'] = False
@@ -1098,18 +1486,14 @@ def show_researcher_detail_view():
                     if st.button("✓ Ja, ta bort permanent"):
                         try:
                             # Ta bort från databasen
-                            delete_query = f"DELETE FROM forskare_permanent WHERE id = {researcher_id}"
-                            
-                            with permanent_engine.connect() as conn:
-                                conn.execute(text(delete_query))
-                                conn.commit()
-                            
-                            # Ta också bort eventuell profildata
-                            if pd.notna(researcher['orcid']):
-                                delete_profile_query = f"DELETE FROM forskare_profiler WHERE orcid = '{researcher['orcid']}'"
-                                with permanent_engine.connect() as conn:
-                                    conn.execute(text(delete_profile_query))
-                                    conn.commit()
+                            with txn(permanent_engine) as conn:
+                                conn.execute(text("DELETE FROM forskare_permanent WHERE id = :id"), {'id': int(researcher_id)})
+                                
+                                # Ta också bort eventuell profildata i samma transaktion
+                                if _nn(researcher['orcid']):
+                                    conn.execute(text("DELETE FROM forskare_profiler WHERE orcid = :orcid"),
+                                                 {'orcid': researcher['orcid']})
+                            _clear_permanent_stats()
                             
                             st.success("Forskaren har tagits bort från databasen.")
                             # Återgå till söksidan
@@ -1133,8 +1517,8 @@ def show_researcher_detail_view():
             st.subheader("Sök publikationer i PubMed")
             
             # Förbered sökterm baserat på forskarens information
-            default_search = f"{researcher['efternamn']} {researcher['namn'][0] if pd.notna(researcher['namn']) and len(researcher['namn']) > 0 else ''}"
-            if pd.notna(researcher['institution']):
+            default_search = f"{researcher['efternamn']} {researcher['namn'][0] if _nn(researcher['namn']) and len(researcher['namn']) > 0 else ''}"
+            if _nn(researcher['institution']):
                 default_search += f" AND {researcher['institution']}[Affiliation]"
                 
             col1, col2 = st.columns([3, 1])
@@ -1145,23 +1529,22 @@ def show_researcher_detail_view():
             with col2:
                 search_button = st.button("Sök publikationer", use_container_width=True)
             
-            if search_button or ('pubmed_results' not in st.session_state):
+            if search_button or ('pubmed_results_df' not in st.session_state):
                 with st.spinner("Söker i PubMed..."):
                     # Använd den uppdaterade search_pubmed-funktionen
-                    articles = search_pubmed(pubmed_query, max_results=20)
+                    articles = _cached_search_pubmed(pubmed_query, max_results=20)
                     if articles:
-                        st.session_state['pubmed_results'] = articles
+                        # Spara DataFrame direkt så att den inte byggs om vid varje omritning
+                        st.session_state['pubmed_results_df'] = pd.DataFrame(articles)
                     else:
                         st.warning("Inga publikationer hittades")
-                        if 'pubmed_results' in st.session_state:
-                            del st.session_state['pubmed_results']
+                        if 'pubmed_results_df' in st.session_state:
+                            del st.session_state['pubmed_results_df']
             
             # Visa sökresultaten om de finns
-            if 'pubmed_results' in st.session_state and st.session_state['pubmed_results']:
-                st.success(f"Hittade {len(st.session_state['pubmed_results'])} publikationer")
-                
-                # Konvertera till DataFrame för snyggare visning
-                df = pd.DataFrame(st.session_state['pubmed_results'])
+            df = st.session_state.get('pubmed_results_df')
+            if df is not None and not df.empty:
+                st.success(f"Hittade {len(df)} publikationer")
                 
                 # Visa enbart de viktigaste kolumnerna först
                 if set(['title', 'authors', 'journal', 'publication_date', 'pmid']).issubset(df.columns):
@@ -1172,30 +1555,22 @@ def show_researcher_detail_view():
                     st.dataframe(df, use_container_width=True)
                 
                 # Möjlighet att visa detaljer om en specifik publikation
-                if len(st.session_state['pubmed_results']) > 0:
-                    selected_title = st.selectbox("Välj publikation för att se detaljer:", 
-                                                [pub['title'] for pub in st.session_state['pubmed_results']])
+                if 'title' in df.columns:
+                    # Valet är radens position, så dubbletter av titlar hålls isär
+                    titles = df['title'].tolist()
+                    selected_pos = st.selectbox("Välj publikation för att se detaljer:", 
+                                                range(len(titles)), format_func=titles.__getitem__)
                     
-                    if selected_title:
-                        selected_pub = next((pub for pub in st.session_state['pubmed_results'] if pub['title'] == selected_title), None)
-                        
-                        if selected_pub:
-                            st.markdown(f"### {selected_pub['title']}")
-                            st.markdown(f"**Författare:** {selected_pub['authors']}")
-                            st.markdown(f"**Journal:** {selected_pub['journal']}")
-                            st.markdown(f"**Publiceringsdatum:** {selected_pub['publication_date']}")
-                            st.markdown(f"**PMID:** [{selected_pub['pmid']}](https://pubmed.ncbi.nlm.nih.gov/{selected_pub['pmid']}/)")
-                            
-                            if 'abstract' in selected_pub and selected_pub['abstract']:
-                                st.markdown("#### Abstract")
-                                st.markdown(selected_pub['abstract'])
+                    if selected_pos is not None:
+                        # Hela publikationen som ett enda markdown-element
+                        st.markdown(_article_markdown(df.iloc[selected_pos]))
             
             # Knapp för att stänga PubMed-resultat
             if st.button("Stäng PubMed-sökning"):
                 if 'show_pubmed_search' in st.session_state:
                     del st.session_state['show_pubmed_search']
-                if 'pubmed_results' in st.session_state:
-                    del st.session_state['pubmed_results']
+                if 'pubmed_results_df' in st.session_state:
+                    del st.session_state['pubmed_results_df']
                 st.rerun()
         
         # === VISA GOOGLE SCHOLAR SÖKRESULTAT OM DET BEHÖVS ===
@@ -1206,7 +1581,7 @@ def show_researcher_detail_view():
             full_name = f"{researcher['namn']} {researcher['efternamn']}".strip()
             
             # Skapa Google Scholar URL
-            scholar_url = f"https://scholar.google.com/scholar?q=author:%22{full_name.replace(' ', '+')}%22"
+            scholar_url = f"https://scholar.google.com/scholar?q=author:%22{quote_plus(full_name)}%22"
             
             st.markdown(f"""
             ### Google Scholar sökning för {full_name}
@@ -1223,7 +1598,7 @@ def show_researcher_detail_view():
             """)
             
             # Visa exempel på söktermer för forskaren
-            institution = researcher['institution'] if pd.notna(researcher['institution']) else ""
+            institution = researcher['institution'] if _nn(researcher['institution']) else ""
             if institution:
                 st.markdown(f"""
                 ### Söktermer att prova:
@@ -1259,9 +1634,12 @@ def show_researcher_detail_view():
                         keywords_list.append(kw)
             
             if keywords_list:
-                # Visa nyckelord som taggar
-                for keyword in keywords_list:
-                    st.markdown(f"<span style='background-color: #f0f2f6; padding: 5px 10px; margin: 5px; border-radius: 20px; display: inline-block;'>{keyword}</span>", unsafe_allow_html=True)
+                # Visa nyckelord som taggar, alla i ett och samma element
+                tags = "".join(
+                    f"<span style='background-color: #f0f2f6; padding: 5px 10px; margin: 5px; border-radius: 20px; display: inline-block;'>{keyword}</span>"
+                    for keyword in keywords_list
+                )
+                st.markdown(tags, unsafe_allow_html=True)
         
         # === PUBLIKATIONER ===
         st.markdown("### Publikationer")
@@ -1272,20 +1650,26 @@ def show_researcher_detail_view():
             if isinstance(works, list) and len(works) > 0:
                 for work in works:
                     with st.expander(work.get('title', 'Okänd titel')):
-                        st.markdown(f"**Publikationstyp:** {work.get('type', 'Ej angiven')}")
-                        st.markdown(f"**Journal:** {work.get('journal-title', 'Ej angiven')}")
+                        # Samla raderna och skriv ut dem med ett enda st.markdown
+                        lines = [
+                            f"**Publikationstyp:** {work.get('type', 'Ej angiven')}",
+                            f"**Journal:** {work.get('journal-title', 'Ej angiven')}"
+                        ]
                         
                         # Visa DOI om det finns
                         if 'external-ids' in work and isinstance(work['external-ids'], list):
-                            for ext_id in work['external-ids']:
-                                if ext_id.get('type') == 'doi':
-                                    st.markdown(f"**DOI:** [{ext_id.get('value')}](https://doi.org/{ext_id.get('value')})")
-                                elif ext_id.get('type') == 'pmid':
-                                    st.markdown(f"**PMID:** [{ext_id.get('value')}](https://pubmed.ncbi.nlm.nih.gov/{ext_id.get('value')}/)")
+                            # Bygg en uppslagstabell typ -> värde i ett svep
+                            ids = {e.get('type'): e.get('value') for e in work['external-ids'] if isinstance(e, dict)}
+                            if 'doi' in ids:
+                                lines.append(f"**DOI:** [{ids['doi']}](https://doi.org/{ids['doi']})")
+                            if 'pmid' in ids:
+                                lines.append(f"**PMID:** [{ids['pmid']}](https://pubmed.ncbi.nlm.nih.gov/{ids['pmid']}/)")
                         
                         # Visa url om det finns
                         if 'url' in work and work['url']:
-                            st.markdown(f"**URL:** [{work['url']}]({work['url']})")
+                            lines.append(f"**URL:** [{work['url']}]({work['url']})")
+                        
+                        st.markdown("\n\n".join(lines))
             else:
                 st.info("Inga publikationer hittades i ORCID-profilen.")
                 # Lägg till knapp för att söka i PubMed
@@ -1304,90 +1688,40 @@ def show_researcher_detail_view():
         # === ANSTÄLLNINGAR ===
         st.markdown("### Anställningar")
         
-        if has_profile and 'employments' in profile_data and profile_data['employments']:
-            employments = profile_data['employments']
-            if isinstance(employments, list) and len(employments) > 0:
-                for employment in employments:
-                    title = employment.get('role-title', 'Okänd titel')
-                    org = employment.get('organization', 'Okänd organisation')
-                    st.markdown(f"**{title}** vid **{org}**")
-                    
-                    # Visa start/slutdatum om de finns
-                    start_date = _format_date(employment.get('start-date'))
-                    end_date = _format_date(employment.get('end-date'))
-                    
-                    if start_date or end_date:
-                        date_text = f"{start_date or '?'} – {end_date or 'nu'}"
-                        st.markdown(f"*{date_text}*")
-                    
-                    st.markdown("---")
-            else:
-                st.info("Inga anställningar hittades i ORCID-profilen.")
+        employments = _nonempty_list(profile_data, 'employments') if has_profile else None
+        if employments:
+            st.dataframe(_profile_records_df(employments, 'role-title', 'Okänd titel'), use_container_width=True, hide_index=True)
         else:
             st.info("Ingen anställningsinformation tillgänglig.")
         
         # === UTBILDNING ===
         st.markdown("### Utbildning")
         
-        if has_profile and 'educations' in profile_data and profile_data['educations']:
-            educations = profile_data['educations']
-            if isinstance(educations, list) and len(educations) > 0:
-                for education in educations:
-                    title = education.get('role-title', 'Okänd utbildning')
-                    org = education.get('organization', 'Okänd organisation')
-                    st.markdown(f"**{title}** vid **{org}**")
-                    
-                    # Visa start/slutdatum om de finns
-                    start_date = _format_date(education.get('start-date'))
-                    end_date = _format_date(education.get('end-date'))
-                    
-                    if start_date or end_date:
-                        date_text = f"{start_date or '?'} – {end_date or 'nu'}"
-                        st.markdown(f"*{date_text}*")
-                    
-                    st.markdown("---")
-            else:
-                st.info("Ingen utbildningsinformation hittades i ORCID-profilen.")
+        educations = _nonempty_list(profile_data, 'educations') if has_profile else None
+        if educations:
+            st.dataframe(_profile_records_df(educations, 'role-title', 'Okänd utbildning'), use_container_width=True, hide_index=True)
         else:
             st.info("Ingen utbildningsinformation tillgänglig.")
         
         # === FINANSIERING ===
         st.markdown("### Finansiering")
         
-        if has_profile and 'fundings' in profile_data and profile_data['fundings']:
-            fundings = profile_data['fundings']
-            if isinstance(fundings, list) and len(fundings) > 0:
-                for funding in fundings:
-                    title = funding.get('title', 'Okänd finansiering')
-                    org = funding.get('organization', 'Okänd organisation')
-                    st.markdown(f"**{title}** från **{org}**")
-                    
-                    # Visa start/slutdatum om de finns
-                    start_date = _format_date(funding.get('start-date'))
-                    end_date = _format_date(funding.get('end-date'))
-                    
-                    if start_date or end_date:
-                        date_text = f"{start_date or '?'} – {end_date or 'nu'}"
-                        st.markdown(f"*{date_text}*")
-                    
-                    st.markdown("---")
-            else:
-                st.info("Ingen finansieringsinformation hittades i ORCID-profilen.")
+        fundings = _nonempty_list(profile_data, 'fundings') if has_profile else None
+        if fundings:
+            st.dataframe(_profile_records_df(fundings, 'title', 'Okänd finansiering'), use_container_width=True, hide_index=True)
         else:
             st.info("Ingen finansieringsinformation tillgänglig.")
         
         # === EXTERNA IDENTIFIERARE ===
         st.markdown("### Externa identifierare")
         
-        if has_profile and 'external_identifiers' in profile_data and profile_data['external_identifiers']:
-            ext_ids = profile_data['external_identifiers']
-            if isinstance(ext_ids, list) and len(ext_ids) > 0:
-                for ext_id in ext_ids:
-                    id_type = ext_id.get('type', 'Okänd typ')
-                    id_value = ext_id.get('value', 'Okänt värde')
-                    st.markdown(f"**{id_type}:** {id_value}")
-            else:
-                st.info("Inga externa identifierare hittades i ORCID-profilen.")
+        ext_ids = _nonempty_list(profile_data, 'external_identifiers') if has_profile else None
+        if ext_ids:
+            ext_df = pd.DataFrame([{
+                'Typ': ext_id.get('type', 'Okänd typ'),
+                'Värde': ext_id.get('value', 'Okänt värde')
+            } for ext_id in ext_ids])
+            st.dataframe(ext_df, use_container_width=True, hide_index=True)
         else:
             st.info("Inga externa identifierare tillgängliga.")
     
@@ -1396,17 +1730,10 @@ def show_researcher_detail_view():
         import traceback
         st.error(traceback.format_exc())
 
-def show_staging_db_page():
-    """Visa arbetsytan med forskare som ännu inte flyttats till permanenta databasen."""
-    st.title("Arbetsyta")
-    
-    st.markdown("""
-    Här kan du hantera forskare som du är intresserad av att arbeta med innan de flyttas till den permanenta databasen. 
-    Du kan lägga till forskare här från ORCID, Excel eller manuellt för att samla och organisera data innan den läggs in i den permanenta databasen.
-    """)
-    
-    # Skapa tabellen om den inte finns
-    with staging_engine.connect() as conn:
+@st.cache_resource
+def _init_staging():
+    """Sätt upp arbetsytans tabell forskare_cleanup en gång per process (PRAGMA sätts i _sqlite_engine)."""
+    with txn(staging_engine) as conn:
         conn.execute(text("""
         CREATE TABLE IF NOT EXISTS forskare_cleanup (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1419,54 +1746,131 @@ def show_staging_db_page():
             pmid TEXT
         )
         """))
+        # Äldre arbetsytor skapades utan pmid-kolumnen
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(forskare_cleanup)"))}
+        if 'pmid' not in columns:
+            conn.execute(text("ALTER TABLE forskare_cleanup ADD COLUMN pmid TEXT"))
+        # Arbetsytan listas sorterad på namn
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_cleanup_name ON forskare_cleanup(efternamn, namn)"))
+    return True
+
+@st.cache_resource
+def _staging_id_col():
+    """Avgör en gång om forskare_cleanup har en id-kolumn eller om rowid ska användas."""
+    with staging_engine.connect() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(forskare_cleanup)"))}
+    return "id" if "id" in columns else "rowid"
+
+@st.cache_data(show_spinner=False)
+def _schema_info():
+    """Kolumninformation för forskare_cleanup, för debugvisningen."""
+    with staging_engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(text("PRAGMA table_info(forskare_cleanup)"))]
+
+@st.cache_data(show_spinner=False)
+def _load_staging():
+    """Läs forskarna i arbetsytan. Cachen töms av _bump_staging_ver vid varje skrivning."""
+    query = f"SELECT {_staging_id_col()} as id, namn, efternamn, orcid, institution, email, notes FROM forskare_cleanup ORDER BY efternamn, namn"
+    return pd.read_sql(query, staging_engine)
+
+def _bump_staging_ver():
+    """Markera att arbetsytan ändrats så att _load_staging läser om tabellen."""
+    # Cachen delas av alla sessioner, så den töms istället för att nycklas på en räknare per session
+    _load_staging.clear()
+    _count_staging.clear()
+    _start_metrics.clear()
+
+@st.dialog("Ta bort forskare")
+def _confirm_delete_dialog(selected_ids):
+    """Bekräftelsedialog för att ta bort valda forskare från arbetsytan."""
+    st.warning(f"Vill du verkligen ta bort {len(selected_ids)} forskare från arbetsytan?")
     
-    # Testa databasens struktur för att avgöra om vi använder rowid eller id
-    try:
-        # Försök först med id-kolumnen
-        query = "SELECT id, namn, efternamn, orcid, institution, email, notes FROM forskare_cleanup ORDER BY efternamn, namn"
-        df = pd.read_sql(query, staging_engine)
-    except Exception as e:
-        st.info("Använder rowid istället för id")
-        # Om det misslyckas, använd rowid istället
-        query = "SELECT rowid as id, namn, efternamn, orcid, institution, email, notes FROM forskare_cleanup ORDER BY efternamn, namn"
+    confirm_col1, confirm_col2 = st.columns(2)
+    with confirm_col1:
+        if st.button("✓ Ja, ta bort", key="confirm_delete", use_container_width=True):
+            # Genomför borttagning av alla valda i en transaktion
+            success_count = 0
+            try:
+                with txn(staging_engine) as conn:
+                    result = conn.execute(
+                        text("DELETE FROM forskare_cleanup WHERE rowid IN :ids").bindparams(
+                            bindparam("ids", expanding=True)),
+                        {"ids": selected_ids})
+                    success_count = result.rowcount
+            except Exception as e:
+                st.error(f"Fel vid borttagning av forskare: {str(e)}")
+            
+            if success_count > 0:
+                _bump_staging_ver()
+                # Meddelandet visas som toast efter omritningen istället för att blockera med en paus
+                st.session_state['staging_flash'] = f"Tog bort {success_count} forskare"
+                # Nollställ valen i tabellen
+                st.session_state.pop("staging_editor", None)
+                st.rerun()
+            else:
+                st.error(f"Kunde inte ta bort några forskare. Kontakta administratören.")
+    
+    with confirm_col2:
+        if st.button("✗ Avbryt", key="cancel_delete", use_container_width=True):
+            st.rerun()
+
+@st.fragment
+def _staging_list(df):
+    """Lista och knappar för arbetsytan. Körs som fragment så att val i listan bara ritar om den här delen."""
+    # Knapparna visas ovanför listan men fylls i först när vi vet vilka rader som är valda
+    actions = st.container()
+    
+    # Lista forskare
+    st.subheader("Forskare i arbetsytan")
+    
+    # Debug-information
+    if st.checkbox("Visa debuginformation"):
+        st.write("DataFrame med forskare:")
+        st.write(df)
+        
+        # Visa alla kolumner i databasen
+        st.write("Databasstruktur:")
         try:
-            df = pd.read_sql(query, staging_engine)
+            st.write(_schema_info())
         except Exception as e:
-            st.error(f"Kunde inte hämta forskare: {str(e)}")
-            # Fallback om något går fel
-            df = pd.DataFrame()
+            st.error(f"Kunde inte hämta databasstruktur: {str(e)}")
     
-    if not df.empty:
-        st.write(f"**{len(df)} forskare i arbetsytan**")
-        
+    # Bygg hela listan som en tabell och låt st.data_editor sköta valet,
+    # istället för fyra kolumner och en checkbox per rad
+    orcid = df['orcid'].where(df['orcid'].notna() & (df['orcid'] != ''))
+    full_name = (df['namn'].fillna('').astype(str) + ' ' + df['efternamn'].fillna('').astype(str)).str.strip()
+    view_df = pd.DataFrame({
+        'Välj': False,
+        'id': df['id'],
+        'Namn': full_name.replace('', 'Okänt namn'),
+        'Institution': df['institution'].fillna('Okänd institution'),
+        'ORCID': 'https://orcid.org/' + orcid,
+    })
+    edited_df = st.data_editor(
+        view_df,
+        column_config={
+            'Välj': st.column_config.CheckboxColumn("Välj"),
+            'id': None,
+            'ORCID': st.column_config.LinkColumn("ORCID", display_text=r"https://orcid\.org/(.*)"),
+        },
+        disabled=['Namn', 'Institution', 'ORCID'],
+        hide_index=True,
+        use_container_width=True,
+        key="staging_editor"
+    )
+    selected_ids = [int(i) for i in edited_df.loc[edited_df['Välj'], 'id']]
+    
+    with actions:
         # Lägg till knappar för att hantera valda forskare
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("Flytta valda till permanenta databasen", use_container_width=True):
-                # Hämta valda forskare
-                selected_ids = []
-                for key, value in st.session_state.items():
-                    if key.startswith("select_") and value == True:
-                        try:
-                            researcher_id = int(key.split('_')[1])
-                            selected_ids.append(researcher_id)
-                        except (IndexError, ValueError):
-                            pass
-                
+            if st.button("Flytta valda till databas", use_container_width=True):
                 if selected_ids:
-                    success_count = 0
-                    failure_messages = []
-                    
-                    for researcher_id in selected_ids:
-                        success, message = move_to_permanent_db(researcher_id, staging_engine)
-                        if success:
-                            success_count += 1
-                        else:
-                            failure_messages.append(message)
+                    success_count, failure_messages = move_to_permanent_db(selected_ids, staging_engine)
                     
                     if success_count > 0:
-                        st.success(f"{success_count} forskare flyttades till permanenta databasen")
+                        st.success(f"{success_count} forskare flyttades till databasen")
                     
                     if failure_messages:
                         st.warning("Problem vid flytt av vissa forskare:")
@@ -1475,89 +1879,21 @@ def show_staging_db_page():
                     
                     # Ladda om listan om något lyckades
                     if success_count > 0:
+                        st.session_state.pop("staging_editor", None)
                         st.rerun()
                 else:
                     st.warning("Inga forskare valda")
         
         with col2:
-            if st.button("Ta bort valda forskare", use_container_width=True):
-                # Hämta valda forskare
-                selected_ids = []
-                for key, value in st.session_state.items():
-                    if key.startswith("select_") and value == True:
-                        try:
-                            researcher_id = int(key.split('_')[1])
-                            selected_ids.append(researcher_id)
-                        except (IndexError, ValueError):
-                            pass
-                
+            if st.button("Ta bort valda", use_container_width=True):
                 if selected_ids:
                     # Visa bekräftelsedialog
-                    st.warning(f"Vill du verkligen ta bort {len(selected_ids)} forskare från arbetsytan?")
-                    
-                    confirm_col1, confirm_col2 = st.columns(2)
-                    with confirm_col1:
-                        if st.button("✓ Ja, ta bort", key="confirm_delete"):
-                            # Genomför borttagning
-                            success_count = 0
-                            error_count = 0
-                            
-                            for researcher_id in selected_ids:
-                                try:
-                                    with staging_engine.connect() as conn:
-                                        # Använd explicit transaktion
-                                        conn.execute(text("BEGIN TRANSACTION"))
-                                        # Visa SQL för felsökning
-                                        delete_sql = f"DELETE FROM forskare_cleanup WHERE rowid = {researcher_id}"
-                                        st.info(f"Kör SQL: {delete_sql}")
-                                        # Kör borttagningen
-                                        result = conn.execute(text(delete_sql))
-                                        # Kontrollera om något togs bort
-                                        if result.rowcount > 0:
-                                            success_count += 1
-                                        conn.execute(text("COMMIT"))
-                                except Exception as e:
-                                    error_count += 1
-                                    st.error(f"Fel vid borttagning av forskare {researcher_id}: {str(e)}")
-                                    # Försök med alternativ metod
-                                    try:
-                                        with staging_engine.connect() as conn:
-                                            conn.execute(text(f"DELETE FROM forskare_cleanup WHERE id = {researcher_id}"))
-                                            conn.commit()
-                                            success_count += 1
-                                    except Exception as inner_e:
-                                        st.error(f"Även alternativ metod misslyckades: {str(inner_e)}")
-                            
-                            if success_count > 0:
-                                st.success(f"Tog bort {success_count} forskare")
-                                # Rensa valda checkboxar
-                                for key in list(st.session_state.keys()):
-                                    if key.startswith("select_"):
-                                        del st.session_state[key]
-                                time.sleep(1)  # Kort paus så användaren hinner se meddelandet
-                                st.rerun()
-                            else:
-                                st.error(f"Kunde inte ta bort några forskare. Kontakta administratören.")
-                            
-                        with confirm_col2:
-                            if st.button("✗ Avbryt", key="cancel_delete"):
-                                st.info("Borttagning avbruten")
-                                st.rerun()
+                    _confirm_delete_dialog(selected_ids)
                 else:
                     st.warning("Inga forskare valda")
         
         with col3:
-            if st.button("Redigera vald forskare", use_container_width=True):
-                # Hämta valda forskare
-                selected_ids = []
-                for key, value in st.session_state.items():
-                    if key.startswith("select_") and value == True:
-                        try:
-                            researcher_id = int(key.split('_')[1])
-                            selected_ids.append(researcher_id)
-                        except (IndexError, ValueError):
-                            pass
-                
+            if st.button("Redigera vald", use_container_width=True):
                 if len(selected_ids) == 1:
                     # Lagra ID för den valda forskaren i session state
                     st.session_state.edit_researcher_id = selected_ids[0]
@@ -1567,99 +1903,75 @@ def show_staging_db_page():
                     st.warning("Välj endast en forskare för redigering")
                 else:
                     st.warning("Ingen forskare vald")
+
+def show_staging_db_page():
+    """Visa arbetsytan med forskare som ännu inte flyttats till permanenta databasen."""
+    st.header("Arbetsyta")
+    
+    st.markdown("""
+    Här kan du hantera forskare som du är intresserad av att arbeta med innan de flyttas till den permanenta databasen. 
+    Använd flikarna ovan för att lägga till fler forskare.
+    """)
+    
+    _init_staging()
+    
+    if msg := st.session_state.pop('staging_flash', None):
+        st.toast(msg)
+    
+    # Hämta alla forskare i arbetsytan (cachat tills någon skriver till tabellen)
+    try:
+        df = _load_staging()
+    except Exception as e:
+        st.error(f"Kunde inte hämta forskare: {str(e)}")
+        # Fallback om något går fel
+        df = pd.DataFrame()
+    
+    if not df.empty:
+        st.write(f"**{len(df)} forskare i arbetsytan**")
         
-        # Lista forskare
-        st.subheader("Forskare i arbetsytan")
-        
-        # Debug-information
-        if st.checkbox("Visa debuginformation"):
-            st.write("DataFrame med forskare:")
-            st.write(df)
-            
-            # Visa alla kolumner i databasen
-            st.write("Databasstruktur:")
-            try:
-                with staging_engine.connect() as conn:
-                    # Hämta kolumninformation
-                    result = conn.execute(text("PRAGMA table_info(forskare_cleanup)"))
-                    columns = [dict(row) for row in result]
-                    st.write(columns)
-            except Exception as e:
-                st.error(f"Kunde inte hämta databasstruktur: {str(e)}")
-        
-        for i, row in df.iterrows():
-            # Använd row['id'] från SQL-frågan
-            row_id = row['id']
-            
-            col1, col2, col3, col4 = st.columns([0.1, 0.3, 0.3, 0.3])
-            
-            with col1:
-                checkbox_key = f"select_{row_id}"
-                # Initiera session state om den inte finns innan vi visar checkboxen
-                if checkbox_key not in st.session_state:
-                    st.session_state[checkbox_key] = False
-                selected = st.checkbox("Välj", key=checkbox_key)
-            
-            with col2:
-                # Säkerställ att vi hanterar tomma namn
-                fname = row['namn'] if pd.notna(row['namn']) else ''
-                lname = row['efternamn'] if pd.notna(row['efternamn']) else ''
-                full_name = f"{fname} {lname}".strip()
-                if not full_name:
-                    full_name = "Okänt namn"
-                st.write(f"**{full_name}**")
-            
-            with col3:
-                # Visa institution om den finns, annars "Okänd"
-                institution = row['institution'] if pd.notna(row['institution']) else 'Okänd institution'
-                st.write(institution)
-            
-            with col4:
-                orcid = row['orcid'] if pd.notna(row['orcid']) else ''
-                if orcid:
-                    st.write(f"[{orcid}](https://orcid.org/{orcid})")
-                else:
-                    st.write("Saknas ORCID")
+        # Listan och knapparna körs om för sig när man kryssar i rader
+        _staging_list(df)
         
         # Visa redigeringsformulär om en forskare är vald för redigering
         if 'show_edit_form' in st.session_state and st.session_state.show_edit_form:
             st.subheader("Redigera forskare")
             
             # Använd rowid för kompatibilitet
-            query = f"SELECT rowid as id, * FROM forskare_cleanup WHERE rowid = {st.session_state.edit_researcher_id}"
+            query = text("SELECT rowid as id, * FROM forskare_cleanup WHERE rowid = :rid")
             try:
-                researcher_df = pd.read_sql(query, staging_engine)
+                researcher_df = pd.read_sql(query, staging_engine, params={'rid': int(st.session_state.edit_researcher_id)})
             except Exception as e:
                 st.error(f"Kunde inte hämta forskare: {str(e)}")
                 researcher_df = pd.DataFrame()
             
             if not researcher_df.empty:
+                # Ersätt saknade värden med tomma strängar en gång för hela raden
                 selected_researcher = researcher_df.iloc[0]
+                row = selected_researcher.where(selected_researcher.notna(), '').to_dict()
                 
                 # Redigera forskarens data
-                new_name = st.text_input("Förnamn", selected_researcher['namn'] if pd.notna(selected_researcher['namn']) else '')
-                new_lastname = st.text_input("Efternamn", selected_researcher['efternamn'] if pd.notna(selected_researcher['efternamn']) else '')
-                new_institution = st.text_input("Institution", selected_researcher['institution'] if pd.notna(selected_researcher['institution']) else '')
-                new_email = st.text_input("Email", selected_researcher['email'] if pd.notna(selected_researcher['email']) else "")
-                new_orcid = st.text_input("ORCID", selected_researcher['orcid'] if pd.notna(selected_researcher['orcid']) else "")
-                new_notes = st.text_area("Noteringar", selected_researcher['notes'] if pd.notna(selected_researcher['notes']) else "")
+                new_name = st.text_input("Förnamn", row['namn'])
+                new_lastname = st.text_input("Efternamn", row['efternamn'])
+                new_institution = st.text_input("Institution", row['institution'])
+                new_email = st.text_input("Email", row['email'])
+                new_orcid = st.text_input("ORCID", row['orcid'])
+                new_notes = st.text_area("Noteringar", row['notes'])
                 
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("Spara ändringar"):
-                        with staging_engine.connect() as conn:
+                        with txn(staging_engine) as conn:
                             # Använd rowid för uppdatering
-                            conn.execute(text(f"""
-                            UPDATE forskare_cleanup 
-                            SET namn = '{new_name}', 
-                                efternamn = '{new_lastname}', 
-                                institution = '{new_institution}', 
-                                email = '{new_email}', 
-                                orcid = '{new_orcid}',
-                                notes = '{new_notes}' 
-                            WHERE rowid = {st.session_state.edit_researcher_id}
-                            """))
-                            conn.commit()
+                            conn.execute(_UPDATE_STAGING_RESEARCHER, {
+                                'namn': new_name,
+                                'efternamn': new_lastname,
+                                'institution': new_institution,
+                                'email': new_email,
+                                'orcid': new_orcid,
+                                'notes': new_notes,
+                                'rid': int(st.session_state.edit_researcher_id)
+                            })
+                        _bump_staging_ver()
                         st.success("Forskarens data har uppdaterats")
                         st.session_state.show_edit_form = False
                         st.rerun()
@@ -1673,7 +1985,7 @@ def show_staging_db_page():
                 st.session_state.show_edit_form = False
     else:
         st.info("Inga forskare i arbetsytan ännu.")
-        st.write("Använd 'Lägg till forskare' för att lägga till forskare till arbetsytan.")
+        st.write("Använd flikarna ovan för att lägga till forskare till arbetsytan.")
 
 def show_add_researcher_page():
     """Sida för att lägga till forskare till arbetsytan"""
@@ -1695,7 +2007,7 @@ def show_add_researcher_page():
         if search_button and orcid_search:
             # Sök efter forskare i ORCID
             with st.spinner("Söker efter forskare..."):
-                researchers = search_orcid_researchers(orcid_search, max_results=10)
+                researchers = _cached_search_orcid(orcid_search, max_results=10)
                 
                 if researchers:
                     st.session_state['orcid_search_results'] = researchers
@@ -1714,9 +2026,10 @@ def show_add_researcher_page():
                 checkbox_key = f"orcid_select_{researcher['orcid']}"
                 
                 with col1:
-                    # Initiera session state för checkbox om den inte finns
+                    # Initiera session state för checkbox om den inte finns, och kom ihåg nyckeln till rensningen
                     if checkbox_key not in st.session_state:
                         st.session_state[checkbox_key] = False
+                        st.session_state.setdefault('orcid_checkbox_keys', set()).add(checkbox_key)
                     
                     selected = st.checkbox("Välj", key=checkbox_key)
                 
@@ -1751,9 +2064,8 @@ def show_add_researcher_page():
                         st.success(f"Lade till {len(selected_researchers)} forskare till arbetsytan")
                         # Rensa sökresultat och valda checkboxes
                         st.session_state.pop('orcid_search_results', None)
-                        for key in list(st.session_state.keys()):
-                            if key.startswith("orcid_select_"):
-                                del st.session_state[key]
+                        for key in st.session_state.pop('orcid_checkbox_keys', ()):
+                            st.session_state.pop(key, None)
                         st.rerun()
                 else:
                     st.warning("Inga forskare valda")
@@ -1777,29 +2089,31 @@ def show_add_researcher_page():
                     invalid_orcids = []
                     
                     for orcid in orcid_list:
-                        if validate_orcid(orcid):
-                            valid_orcids.append(orcid)
-                        else:
-                            invalid_orcids.append(orcid)
+                        (valid_orcids if _ORCID_RE.fullmatch(orcid) else invalid_orcids).append(orcid)
                     
                     if invalid_orcids:
                         st.warning(f"Följande ORCID-ID har ogiltigt format: {', '.join(invalid_orcids)}")
                     
                     if valid_orcids:
-                        fetched_researchers = []
-                        
                         progress_bar = st.progress(0)
                         status_text = st.empty()
                         
-                        for i, orcid in enumerate(valid_orcids):
-                            status_text.text(f"Hämtar {i+1} av {len(valid_orcids)}: {orcid}")
-                            researcher = fetch_researcher_by_orcid(orcid)
-                            
-                            if researcher:
-                                fetched_researchers.append(researcher)
-                            
-                            # Uppdatera framstegsindikator
-                            progress_bar.progress((i + 1) / len(valid_orcids))
+                        fetched_researchers = []
+                        
+                        # Hämta parallellt; varje anrop väntar mest på nätverket.
+                        # Trådarna får sidans körkontext så att st-anrop i hämtningen fungerar.
+                        ctx = get_script_run_ctx()
+                        with ThreadPoolExecutor(max_workers=8, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+                            futures = {executor.submit(_cached_fetch_by_orcid, orcid): orcid for orcid in valid_orcids}
+                            for i, future in enumerate(as_completed(futures)):
+                                status_text.text(f"Hämtade {i+1} av {len(valid_orcids)}: {futures[future]}")
+                                researcher = future.result()
+                                
+                                if researcher:
+                                    fetched_researchers.append(researcher)
+                                
+                                # Uppdatera framstegsindikator
+                                progress_bar.progress((i + 1) / len(valid_orcids))
                         
                         if fetched_researchers:
                             st.success(f"Hämtade information för {len(fetched_researchers)} forskare")
@@ -1896,172 +2210,185 @@ def show_add_researcher_page():
         
         if uploaded_file is not None:
             # Hantera excelfilen
-            process_excel_file(uploaded_file)
+            process_excel_file(uploaded_file.getvalue())
 
-def search_google_scholar(researcher_name, max_attempts=3, orcid=None):
-    """Sök efter en forskare på Google Scholar och försök extrahera profil information."""
-    import requests
-    from bs4 import BeautifulSoup
-    import time
-    import re
+@st.cache_resource
+def _scholar_session():
+    """Delad HTTP-session mot Google Scholar så att anslutningen återanvänds mellan sökning och profil."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=10,
+        # Rate-limiting (429) och serverfel hanteras här: Retry väntar enligt Retry-After
+        # om servern skickar det, annars med exponentiell backoff
+        max_retries=Retry(
+            total=3,
+            backoff_factor=2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+    session.mount("https://", adapter)
+    # Accept-Encoding lämnas åt requests: standardvärdet tar med gzip/deflate och
+    # br när paketet brotli är installerat, så vi ber aldrig om något som inte kan packas upp
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept-Language': 'sv,en;q=0.9'
+    })
+    return session
+
+# Bygg bara de delträd vi faktiskt läser: profillänkarna på söksidan
+SEARCH_STRAINER = SoupStrainer(class_='gs_ai_name')
+
+def _has_class(name):
+    """XPath-villkor som matchar en hel klass i class-attributet, som CSS-selektorn .name."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Profilsidan läses med lxml direkt; uttrycken kompileras en gång istället för vid varje anrop
+XP_NAME = etree.XPath('//*[@id="gsc_prf_in"]')
+XP_AFFILIATION = etree.XPath(f'//*[{_has_class("gsc_prf_il")}]')
+XP_STATS = etree.XPath(f'//*[{_has_class("gsc_rsb_std")}]')
+XP_INTERESTS = etree.XPath(f'//*[{_has_class("gsc_prf_inta")}]')
+XP_COAUTHORS = etree.XPath(f'//*[{_has_class("gsc_rsb_aa")}]')
+XP_COAUTHOR_LINK = etree.XPath(f'.//*[{_has_class("gsc_rsb_a_desc")}]//a')
+
+def _parse(resp, strainer=None):
+    """Parsa ett HTTP-svar med lxml direkt från bytes (snabbare än html.parser)."""
+    return BeautifulSoup(resp.content, 'lxml', parse_only=strainer)
+
+def _empty_result(researcher_name, method):
+    """Tomt Scholar-resultat när ingen profil hittades eller sökningen misslyckades."""
+    return {
+        'name': researcher_name,
+        'profile_url': "",
+        'citations': 0,
+        'h_index': 0,
+        'i10_index': 0,
+        'affiliation': "",
+        'interests': [],
+        'coauthors': [],
+        'search_method': method
+    }
+
+def _parse_scholar_profile(html_bytes, profile_url, method):
+    """Extrahera profildata från en Scholar-profilsida; varje XPath-uttryck körs bara en gång."""
+    profile_tree = lxml_html.fromstring(html_bytes)
+    name_el = XP_NAME(profile_tree)
+    aff_el = XP_AFFILIATION(profile_tree)
+    stats = XP_STATS(profile_tree)
+    interests = XP_INTERESTS(profile_tree)
+    coauthor_elements = XP_COAUTHORS(profile_tree)
+    
+    # Leta efter medförfattare
+    coauthors = []
+    for coauthor in coauthor_elements:
+        name_elem = XP_COAUTHOR_LINK(coauthor)
+        if name_elem:
+            coauthors.append({
+                'name': name_elem[0].text_content(),
+                'profile_url': "https://scholar.google.com" + name_elem[0].get('href', '')
+            })
     
+    return {
+        'name': name_el[0].text_content() if name_el else "",
+        'profile_url': profile_url,
+        'citations': int(stats[0].text_content()) if len(stats) > 0 else 0,
+        'h_index': int(stats[2].text_content()) if len(stats) > 2 else 0,
+        'i10_index': int(stats[4].text_content()) if len(stats) > 4 else 0,
+        'affiliation': aff_el[0].text_content() if aff_el else "",
+        'interests': [tag.text_content() for tag in interests],
+        'search_method': method,
+        'coauthors': coauthors
+    }
+
+def search_google_scholar(researcher_name, orcid=None):
+    """Sök efter en forskare på Google Scholar och försök extrahera profil information."""
     try:
         st.info(f"Söker efter {researcher_name} på Google Scholar...")
         
+        session = _scholar_session()
+        
         # Försök först med direkt sökning om ORCID finns
         if orcid and orcid.strip():
             # Även om Google Scholar inte använder ORCID direkt, kan vi prova att söka på det tillsammans med namnet
             direct_search_term = f"{researcher_name} {orcid}"
             st.info(f"Provar med direkt sökning: {direct_search_term}")
             
-            direct_url = f"https://scholar.google.com/scholar?hl=sv&as_sdt=0%2C5&q={direct_search_term.replace(' ', '+')}"
+            direct_url = f"https://scholar.google.com/scholar?hl=sv&as_sdt=0%2C5&q={quote_plus(direct_search_term)}"
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(direct_url, headers=headers)
+            response = session.get(direct_url, timeout=10)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = _parse(response, SEARCH_STRAINER)
                 
-                # Leta efter profillänk direkt i sökresultaten
-                profile_links = soup.select('.gs_ai_name a')
+                # Leta efter profillänk direkt i sökresultaten; första träffen räcker
+                first = soup.select_one('.gs_ai_name a')
                 
-                if profile_links:
-                    # Använd första träffen
-                    direct_profile_url = "https://scholar.google.com" + profile_links[0]['href']
+                if first:
+                    direct_profile_url = "https://scholar.google.com" + first['href']
                     st.success(f"Hittade profil direkt: {direct_profile_url}")
                     
                     # Besök profilen och fortsätt med resten av logiken
-                    profile_response = requests.get(direct_profile_url, headers=headers)
+                    profile_response = session.get(direct_profile_url, timeout=10)
                     
                     if profile_response.status_code == 200:
-                        profile_soup = BeautifulSoup(profile_response.text, 'html.parser')
-                        
-                        # Extrahera information
-                        citation_stats = profile_soup.select('.gsc_rsb_std')
-                        
-                        result = {
-                            'name': profile_soup.select_one('#gsc_prf_in').text if profile_soup.select_one('#gsc_prf_in') else "",
-                            'profile_url': direct_profile_url,
-                            'citations': int(citation_stats[0].text) if len(citation_stats) > 0 else 0,
-                            'h_index': int(citation_stats[2].text) if len(citation_stats) > 2 else 0,
-                            'i10_index': int(citation_stats[4].text) if len(citation_stats) > 4 else 0,
-                            'affiliation': profile_soup.select_one('.gsc_prf_il').text if profile_soup.select_one('.gsc_prf_il') else "",
-                            'interests': [tag.text for tag in profile_soup.select('.gsc_prf_inta')],
-                            'search_method': 'direct_orcid'
-                        }
-                        
-                        # Leta efter medförfattare
-                        coauthors = []
-                        coauthor_elements = profile_soup.select('.gsc_rsb_aa')
-                        for coauthor in coauthor_elements:
-                            name_elem = coauthor.select_one('.gsc_rsb_a_desc a')
-                            if name_elem:
-                                coauthor_name = name_elem.text
-                                coauthor_link = "https://scholar.google.com" + name_elem['href']
-                                coauthors.append({
-                                    'name': coauthor_name,
-                                    'profile_url': coauthor_link
-                                })
-                        
-                        result['coauthors'] = coauthors
-                        
-                        return result
+                        return _parse_scholar_profile(profile_response.content, direct_profile_url, 'direct_orcid')
         
         # Standardsökning om direktsökning misslyckas eller inte finns ORCID
-        # Förbered sökterm
-        search_term = researcher_name.replace(" ", "+")
-        url = f"https://scholar.google.com/scholar?hl=sv&as_sdt=0%2C5&q={search_term}"
+        # Förbered sökterm; quote_plus hanterar å/ä/ö, apostrofer och &
+        url = f"https://scholar.google.com/scholar?hl=sv&as_sdt=0%2C5&q={quote_plus(researcher_name)}"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # Omförsök vid rate-limiting sköts av sessionens Retry-inställning
+        response = session.get(url, timeout=10)
         
-        # Försök flera gånger om det behövs (för att hantera rate-limiting)
-        for attempt in range(max_attempts):
-            response = requests.get(url, headers=headers)
+        if response.status_code == 200:
+            soup = _parse(response, SEARCH_STRAINER)
             
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+            # Leta efter profillänk i sökresultaten
+            first = soup.select_one('.gs_ai_name a')
+            
+            if first:
+                # Ta första länken (mest relevant)
+                profile_url = "https://scholar.google.com" + first['href']
                 
-                # Leta efter profillänk i sökresultaten
-                profile_links = soup.select('.gs_ai_name a')
+                # Besök profilsidan
+                profile_response = session.get(profile_url, timeout=10)
                 
-                if profile_links:
-                    # Ta första länken (mest relevant)
-                    profile_url = "https://scholar.google.com" + profile_links[0]['href']
-                    
-                    # Besök profilsidan
-                    profile_response = requests.get(profile_url, headers=headers)
-                    
-                    if profile_response.status_code == 200:
-                        profile_soup = BeautifulSoup(profile_response.text, 'html.parser')
-                        
-                        # Extrahera information
-                        citation_stats = profile_soup.select('.gsc_rsb_std')
-                        
-                        result = {
-                            'name': profile_soup.select_one('#gsc_prf_in').text if profile_soup.select_one('#gsc_prf_in') else "",
-                            'profile_url': profile_url,
-                            'citations': int(citation_stats[0].text) if len(citation_stats) > 0 else 0,
-                            'h_index': int(citation_stats[2].text) if len(citation_stats) > 2 else 0,
-                            'i10_index': int(citation_stats[4].text) if len(citation_stats) > 4 else 0,
-                            'affiliation': profile_soup.select_one('.gsc_prf_il').text if profile_soup.select_one('.gsc_prf_il') else "",
-                            'interests': [tag.text for tag in profile_soup.select('.gsc_prf_inta')],
-                            'search_method': 'name_search'
-                        }
-                        
-                        # Leta efter medförfattare
-                        coauthors = []
-                        coauthor_elements = profile_soup.select('.gsc_rsb_aa')
-                        for coauthor in coauthor_elements:
-                            name_elem = coauthor.select_one('.gsc_rsb_a_desc a')
-                            if name_elem:
-                                coauthor_name = name_elem.text
-                                coauthor_link = "https://scholar.google.com" + name_elem['href']
-                                coauthors.append({
-                                    'name': coauthor_name,
-                                    'profile_url': coauthor_link
-                                })
-                        
-                        result['coauthors'] = coauthors
-                        
-                        return result
-            
-            # Om vi får 429 Too Many Requests, vänta längre tid mellan försöken
-            if response.status_code == 429:
-                time.sleep(5 * (attempt + 1))
-            else:
-                time.sleep(1)  # Kort paus mellan försök
+                if profile_response.status_code == 200:
+                    return _parse_scholar_profile(profile_response.content, profile_url, 'name_search')
         
         # Om vi inte hittar profilen
-        return {
-            'name': researcher_name,
-            'profile_url': "",
-            'citations': 0,
-            'h_index': 0,
-            'i10_index': 0,
-            'affiliation': "",
-            'interests': [],
-            'coauthors': [],
-            'search_method': 'no_results'
-        }
+        return _empty_result(researcher_name, 'no_results')
         
     except Exception as e:
         st.warning(f"Kunde inte söka Google Scholar: {str(e)}")
-        return {
-            'name': researcher_name,
-            'profile_url': "",
-            'citations': 0,
-            'h_index': 0,
-            'i10_index': 0,
-            'affiliation': "",
-            'interests': [],
-            'coauthors': [],
-            'search_method': 'error'
-        }
+        return _empty_result(researcher_name, 'error')
+
+SCHOLAR_CACHE_TTL = datetime.timedelta(days=7)
+
+def cached_scholar_search(researcher_name, orcid=None):
+    """Som search_google_scholar, men läser hittade profiler från diskcachen om de är färska."""
+    eng = _cache_engine()
+    key = {'namn': researcher_name, 'orcid': orcid or ""}
+    
+    row = None
+    with eng.connect() as conn:
+        row = conn.execute(text("SELECT result, fetched_at FROM scholar_cache WHERE namn = :namn AND orcid = :orcid"), key).first()
+    if row and time.time() - row.fetched_at < SCHOLAR_CACHE_TTL.total_seconds():
+        return json.loads(row.result)
+    
+    result = search_google_scholar(researcher_name, orcid=orcid)
+    
+    # Spara bara träffar; tomma svar kan bero på rate-limiting och ska provas igen
+    if result.get('profile_url'):
+        with txn(eng) as conn:
+            conn.execute(text("""
+                INSERT OR REPLACE INTO scholar_cache (namn, orcid, result, fetched_at)
+                VALUES (:namn, :orcid, :result, :fetched_at)
+            """), {**key, 'result': json.dumps(result), 'fetched_at': time.time()})
+    return result
 
 def fetch_researcher_by_orcid(orcid):
     """Hämta forskare direkt via ORCID-ID."""
@@ -2103,6 +2430,20 @@ def fetch_researcher_by_orcid(orcid):
         st.error(traceback.format_exc())
         return None
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_by_orcid_cached(orcid):
+    return fetch_researcher_by_orcid(orcid)
+
+def _cached_fetch_by_orcid(orcid):
+    """Cachad fetch_researcher_by_orcid så att samma ORCID-ID bara hämtas en gång per timme.
+    
+    None (inte hittad eller fel vid hämtningen) cachas inte, så ett tillfälligt fel försvinner vid nästa försök.
+    """
+    researcher = _fetch_by_orcid_cached(orcid)
+    if researcher is None:
+        _fetch_by_orcid_cached.clear(orcid)
+    return researcher
+
 def main():
     """Huvudfunktion som kör applikationen."""
     initialize_session_state()
@@ -2168,22 +2509,18 @@ def main():
         col1, col2, col3 = st.columns(3)
         
         try:
+            antal, antal_arbetsyta, senast = _start_metrics()
+            
             with col1:
                 # Antal forskare i permanenta databasen
-                result = pd.read_sql("SELECT COUNT(*) as antal FROM forskare_permanent", permanent_engine)
-                antal = result['antal'].iloc[0] if not result.empty else 0
                 st.metric("Forskare i databasen", antal)
                 
             with col2:
                 # Antal forskare i arbetsytan
-                result = pd.read_sql("SELECT COUNT(*) as antal FROM forskare_cleanup", staging_engine)
-                antal_arbetsyta = result['antal'].iloc[0] if not result.empty else 0
                 st.metric("Forskare i arbetsytan", antal_arbetsyta)
                 
             with col3:
                 # Senaste uppdateringen
-                result = pd.read_sql("SELECT MAX(last_updated) as senast FROM forskare_profiler", permanent_engine)
-                senast = result['senast'].iloc[0] if not result.empty else "Aldrig"
                 st.metric("Senaste uppdatering", senast)
         except Exception as e:
             st.info("Inga statistikdata tillgängliga ännu")
@@ -2249,13 +2586,8 @@ def main():
                 st.subheader("Senast tillagda forskare")
                 
                 # Hämta de 10 senast tillagda forskarna
-                recent_query = """
-                SELECT * FROM forskare_permanent 
-                ORDER BY created_date DESC 
-                LIMIT 10
-                """
                 try:
-                    recent_df = pd.read_sql(recent_query, permanent_engine)
+                    recent_df = _recent_permanent(10)
                     display_researcher_list(recent_df)
                 except Exception as e:
                     st.error(f"Kunde inte hämta senaste forskare: {str(e)}")
@@ -2265,14 +2597,7 @@ def main():
                 
                 try:
                     # Räkna antal forskare per institution
-                    institution_query = """
-                    SELECT institution, COUNT(*) as antal
-                    FROM forskare_permanent
-                    GROUP BY institution
-                    ORDER BY antal DESC
-                    LIMIT 10
-                    """
-                    institution_stats = pd.read_sql(institution_query, permanent_engine)
+                    institution_stats = _institution_stats()
                     
                     if not institution_stats.empty:
                         st.bar_chart(institution_stats.set_index('institution'), use_container_width=True)
@@ -2280,17 +2605,7 @@ def main():
                         st.info("Ingen statistik tillgänglig ännu.")
                         
                     # Visa statistik om antal med ORCID vs utan
-                    orcid_query = """
-                    SELECT 
-                        CASE 
-                            WHEN orcid IS NOT NULL AND orcid != '' THEN 'Har ORCID' 
-                            ELSE 'Saknar ORCID' 
-                        END as orcid_status,
-                        COUNT(*) as antal
-                    FROM forskare_permanent
-                    GROUP BY orcid_status
-                    """
-                    orcid_stats = pd.read_sql(orcid_query, permanent_engine)
+                    orcid_stats = _orcid_stats()
                     
                     if not orcid_stats.empty:
                         st.subheader("ORCID-statistik")
@@ -2309,250 +2624,7 @@ def main():
         
         # Arbetsyta - Här ser man forskare som har lagts till men inte flyttats till permanenta databasen
         with leta_tabs[0]:
-            st.header("Arbetsyta")
-            
-            st.markdown("""
-            Här kan du hantera forskare som du är intresserad av att arbeta med innan de flyttas till den permanenta databasen. 
-            Använd flikarna ovan för att lägga till fler forskare.
-            """)
-            
-            # Hämta alla forskare i arbetsytan
-            try:
-                # Försök först med id-kolumnen
-                query = "SELECT id, namn, efternamn, orcid, institution, email, notes FROM forskare_cleanup ORDER BY efternamn, namn"
-                df = pd.read_sql(query, staging_engine)
-            except Exception as e:
-                # Om det misslyckas, använd rowid istället
-                query = "SELECT rowid as id, namn, efternamn, orcid, institution, email, notes FROM forskare_cleanup ORDER BY efternamn, namn"
-                try:
-                    df = pd.read_sql(query, staging_engine)
-                except Exception as e:
-                    st.error(f"Kunde inte hämta forskare: {str(e)}")
-                    # Fallback om något går fel
-                    df = pd.DataFrame()
-            
-            if not df.empty:
-                st.write(f"**{len(df)} forskare i arbetsytan**")
-                
-                # Lägg till knappar för att hantera valda forskare
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    if st.button("Flytta valda till databas", use_container_width=True):
-                        # Hämta valda forskare
-                        selected_ids = []
-                        for key, value in st.session_state.items():
-                            if key.startswith("select_") and value == True:
-                                try:
-                                    researcher_id = int(key.split('_')[1])
-                                    selected_ids.append(researcher_id)
-                                except (IndexError, ValueError):
-                                    pass
-                        
-                        if selected_ids:
-                            success_count = 0
-                            failure_messages = []
-                            
-                            for researcher_id in selected_ids:
-                                success, message = move_to_permanent_db(researcher_id, staging_engine)
-                                if success:
-                                    success_count += 1
-                                else:
-                                    failure_messages.append(message)
-                            
-                            if success_count > 0:
-                                st.success(f"{success_count} forskare flyttades till databasen")
-                            
-                            if failure_messages:
-                                st.warning("Problem vid flytt av vissa forskare:")
-                                for msg in failure_messages:
-                                    st.write(f"• {msg}")
-                            
-                            # Ladda om listan om något lyckades
-                            if success_count > 0:
-                                st.rerun()
-                        else:
-                            st.warning("Inga forskare valda")
-                
-                with col2:
-                    if st.button("Ta bort valda", use_container_width=True):
-                        # Hämta valda forskare
-                        selected_ids = []
-                        for key, value in st.session_state.items():
-                            if key.startswith("select_") and value == True:
-                                try:
-                                    researcher_id = int(key.split('_')[1])
-                                    selected_ids.append(researcher_id)
-                                except (IndexError, ValueError):
-                                    pass
-                        
-                        if selected_ids:
-                            # Visa bekräftelsedialog
-                            st.warning(f"Vill du verkligen ta bort {len(selected_ids)} forskare från arbetsytan?")
-                            
-                            confirm_col1, confirm_col2 = st.columns(2)
-                            with confirm_col1:
-                                if st.button("✓ Ja, ta bort", key="confirm_delete"):
-                                    # Genomför borttagning
-                                    success_count = 0
-                                    error_count = 0
-                                    
-                                    for researcher_id in selected_ids:
-                                        try:
-                                            with staging_engine.connect() as conn:
-                                                # Använd explicit transaktion
-                                                conn.execute(text("BEGIN TRANSACTION"))
-                                                # Visa SQL för felsökning
-                                                delete_sql = f"DELETE FROM forskare_cleanup WHERE rowid = {researcher_id}"
-                                                st.info(f"Kör SQL: {delete_sql}")
-                                                # Kör borttagningen
-                                                result = conn.execute(text(delete_sql))
-                                                # Kontrollera om något togs bort
-                                                if result.rowcount > 0:
-                                                    success_count += 1
-                                                conn.execute(text("COMMIT"))
-                                        except Exception as e:
-                                            error_count += 1
-                                            st.error(f"Fel vid borttagning av forskare {researcher_id}: {str(e)}")
-                                            # Försök med alternativ metod
-                                            try:
-                                                with staging_engine.connect() as conn:
-                                                    conn.execute(text(f"DELETE FROM forskare_cleanup WHERE id = {researcher_id}"))
-                                                    conn.commit()
-                                                    success_count += 1
-                                            except Exception as inner_e:
-                                                st.error(f"Även alternativ metod misslyckades: {str(inner_e)}")
-                                    
-                                    if success_count > 0:
-                                        st.success(f"Tog bort {success_count} forskare")
-                                        # Rensa valda checkboxar
-                                        for key in list(st.session_state.keys()):
-                                            if key.startswith("select_"):
-                                                del st.session_state[key]
-                                        time.sleep(1)  # Kort paus så användaren hinner se meddelandet
-                                        st.rerun()
-                                    else:
-                                        st.error(f"Kunde inte ta bort några forskare. Kontakta administratören.")
-                                    
-                                with confirm_col2:
-                                    if st.button("✗ Avbryt", key="cancel_delete"):
-                                        st.info("Borttagning avbruten")
-                                        st.rerun()
-                        else:
-                            st.warning("Inga forskare valda")
-                
-                with col3:
-                    if st.button("Redigera vald", use_container_width=True):
-                        # Hämta valda forskare
-                        selected_ids = []
-                        for key, value in st.session_state.items():
-                            if key.startswith("select_") and value == True:
-                                try:
-                                    researcher_id = int(key.split('_')[1])
-                                    selected_ids.append(researcher_id)
-                                except (IndexError, ValueError):
-                                    pass
-                        
-                        if len(selected_ids) == 1:
-                            # Lagra ID för den valda forskaren i session state
-                            st.session_state.edit_researcher_id = selected_ids[0]
-                            st.session_state.show_edit_form = True
-                            st.rerun()
-                        elif len(selected_ids) > 1:
-                            st.warning("Välj endast en forskare för redigering")
-                        else:
-                            st.warning("Ingen forskare vald")
-                
-                # Lista forskare
-                st.subheader("Forskare i arbetsytan")
-                
-                for i, row in df.iterrows():
-                    # Använd row['id'] från SQL-frågan
-                    row_id = row['id']
-                    
-                    col1, col2, col3, col4 = st.columns([0.1, 0.3, 0.3, 0.3])
-                    
-                    with col1:
-                        checkbox_key = f"select_{row_id}"
-                        # Initiera session state om den inte finns innan vi visar checkboxen
-                        if checkbox_key not in st.session_state:
-                            st.session_state[checkbox_key] = False
-                        selected = st.checkbox("Välj", key=checkbox_key)
-                    
-                    with col2:
-                        # Säkerställ att vi hanterar tomma namn
-                        fname = row['namn'] if pd.notna(row['namn']) else ''
-                        lname = row['efternamn'] if pd.notna(row['efternamn']) else ''
-                        full_name = f"{fname} {lname}".strip()
-                        if not full_name:
-                            full_name = "Okänt namn"
-                        st.write(f"**{full_name}**")
-                    
-                    with col3:
-                        # Visa institution om den finns, annars "Okänd"
-                        institution = row['institution'] if pd.notna(row['institution']) else 'Okänd institution'
-                        st.write(institution)
-                    
-                    with col4:
-                        orcid = row['orcid'] if pd.notna(row['orcid']) else ''
-                        if orcid:
-                            st.write(f"[{orcid}](https://orcid.org/{orcid})")
-                        else:
-                            st.write("Saknas ORCID")
-                
-                # Visa redigeringsformulär om en forskare är vald för redigering
-                if 'show_edit_form' in st.session_state and st.session_state.show_edit_form:
-                    st.subheader("Redigera forskare")
-                    
-                    # Använd rowid för kompatibilitet
-                    query = f"SELECT rowid as id, * FROM forskare_cleanup WHERE rowid = {st.session_state.edit_researcher_id}"
-                    try:
-                        researcher_df = pd.read_sql(query, staging_engine)
-                    except Exception as e:
-                        st.error(f"Kunde inte hämta forskare: {str(e)}")
-                        researcher_df = pd.DataFrame()
-                    
-                    if not researcher_df.empty:
-                        selected_researcher = researcher_df.iloc[0]
-                        
-                        # Redigera forskarens data
-                        new_name = st.text_input("Förnamn", selected_researcher['namn'] if pd.notna(selected_researcher['namn']) else '')
-                        new_lastname = st.text_input("Efternamn", selected_researcher['efternamn'] if pd.notna(selected_researcher['efternamn']) else '')
-                        new_institution = st.text_input("Institution", selected_researcher['institution'] if pd.notna(selected_researcher['institution']) else '')
-                        new_email = st.text_input("Email", selected_researcher['email'] if pd.notna(selected_researcher['email']) else "")
-                        new_orcid = st.text_input("ORCID", selected_researcher['orcid'] if pd.notna(selected_researcher['orcid']) else "")
-                        new_notes = st.text_area("Noteringar", selected_researcher['notes'] if pd.notna(selected_researcher['notes']) else "")
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button("Spara ändringar"):
-                                with staging_engine.connect() as conn:
-                                    # Använd rowid för uppdatering
-                                    conn.execute(text(f"""
-                                    UPDATE forskare_cleanup 
-                                    SET namn = '{new_name}', 
-                                        efternamn = '{new_lastname}', 
-                                        institution = '{new_institution}', 
-                                        email = '{new_email}', 
-                                        orcid = '{new_orcid}',
-                                        notes = '{new_notes}' 
-                                    WHERE rowid = {st.session_state.edit_researcher_id}
-                                    """))
-                                    conn.commit()
-                                st.success("Forskarens data har uppdaterats")
-                                st.session_state.show_edit_form = False
-                                st.rerun()
-                        
-                        with col2:
-                            if st.button("Avbryt"):
-                                st.session_state.show_edit_form = False
-                                st.rerun()
-                    else:
-                        st.error("Kunde inte hitta forskaren. Försök igen.")
-                        st.session_state.show_edit_form = False
-            else:
-                st.info("Inga forskare i arbetsytan ännu.")
-                st.write("Använd flikarna ovan för att lägga till forskare till arbetsytan.")
+            show_staging_db_page()
         
         # ORCID-sökning
         with leta_tabs[1]:
@@ -2566,71 +2638,73 @@ def main():
                 search_button = st.button("Sök ORCID", use_container_width=True)
             
             if search_button and orcid_search:
-                # Sök efter forskare i ORCID
-                with st.spinner("Söker efter forskare..."):
-                    researchers = search_orcid_researchers(orcid_search, max_results=10)
-                    
-                    if researchers:
-                        st.session_state['orcid_search_results'] = researchers
-                        st.success(f"Hittade {len(researchers)} forskare")
-                    else:
-                        st.warning("Inga forskare hittades")
+                # Sök efter forskare i ORCID i bakgrunden; resultatet hämtas vid en senare omritning
+                st.session_state['orcid_job'] = _io_pool().submit(_orcid_search_job, orcid_search, 10)
+            
+            if job := _finished_job('orcid_job'):
+                try:
+                    researchers = job.result()
+                except Exception as e:
+                    st.error(f"Ett fel uppstod vid sökning i ORCID: {str(e)}")
+                    researchers = []
+                
+                if researchers:
+                    st.session_state['orcid_search_results'] = researchers
+                    # Nya resultat, så tidigare val i tabellen gäller inte längre
+                    st.session_state.pop("orcid_editor", None)
+                    st.success(f"Hittade {len(researchers)} forskare")
+                else:
+                    st.warning("Inga forskare hittades")
+            
+            if 'orcid_job' in st.session_state:
+                _wait_for_job('orcid_job', "Söker efter forskare...")
             
             # Visa resultat om de finns
-            if 'orcid_search_results' in st.session_state and st.session_state['orcid_search_results']:
+            if msg := st.session_state.pop('orcid_flash', None):
+                st.toast(msg, icon="✅")
+            
+            results = st.session_state.get('orcid_search_results')
+            if results:
                 st.subheader("Sökresultat")
                 
-                for idx, researcher in enumerate(st.session_state['orcid_search_results']):
-                    col1, col2, col3, col4 = st.columns([0.1, 0.3, 0.3, 0.3])
-                    
-                    # Generera ett unikt nyckelvärde för varje forskare
-                    orcid_id = researcher.get('orcid', f"noid_{idx}")
-                    checkbox_key = f"orcid_select_{orcid_id}"
-                    
-                    with col1:
-                        # Initiera session state för checkbox om den inte finns
-                        if checkbox_key not in st.session_state:
-                            st.session_state[checkbox_key] = False
-                        
-                        selected = st.checkbox("Välj", key=checkbox_key)
-                    
-                    with col2:
-                        full_name = f"{researcher.get('namn', '')} {researcher.get('efternamn', '')}".strip()
-                        if not full_name:
-                            full_name = "Okänt namn"
-                        st.write(f"**{full_name}**")
-                    
-                    with col3:
-                        institution = researcher.get('institution', "Okänd institution")
-                        st.write(institution)
-                    
-                    with col4:
-                        orcid = researcher.get('orcid', '')
-                        if orcid:
-                            st.write(f"[{orcid}](https://orcid.org/{orcid})")
-                        else:
-                            st.write("Saknas ORCID")
+                # En tabell med valkolumn istället för fyra widgets per forskare
+                results_df = pd.DataFrame(results)
+                for col in ('namn', 'efternamn', 'institution', 'orcid'):
+                    if col not in results_df.columns:
+                        results_df[col] = ''
+                orcid = results_df['orcid'].where(results_df['orcid'].notna() & (results_df['orcid'] != ''))
+                full_name = (results_df['namn'].fillna('').astype(str) + ' ' + results_df['efternamn'].fillna('').astype(str)).str.strip()
+                institution = results_df['institution'].where(results_df['institution'].notna() & (results_df['institution'] != ''))
+                view_df = pd.DataFrame({
+                    'Välj': False,
+                    'Namn': full_name.replace('', 'Okänt namn'),
+                    'Institution': institution.fillna('Okänd institution'),
+                    'ORCID': 'https://orcid.org/' + orcid,
+                })
+                edited_df = st.data_editor(
+                    view_df,
+                    column_config={
+                        'Välj': st.column_config.CheckboxColumn("Välj"),
+                        'ORCID': st.column_config.LinkColumn("ORCID", display_text=r"https://orcid\.org/(.*)"),
+                    },
+                    disabled=['Namn', 'Institution', 'ORCID'],
+                    hide_index=True,
+                    use_container_width=True,
+                    key="orcid_editor"
+                )
                 
                 # Knapp för att lägga till valda forskare
                 if st.button("Lägg till valda forskare till arbetsytan"):
-                    selected_researchers = []
-                    for researcher in st.session_state['orcid_search_results']:
-                        orcid_id = researcher.get('orcid', f"noid_{st.session_state['orcid_search_results'].index(researcher)}")
-                        checkbox_key = f"orcid_select_{orcid_id}"
-                        if checkbox_key in st.session_state and st.session_state[checkbox_key]:
-                            selected_researchers.append(researcher)
+                    selected_researchers = [results[pos] for pos in edited_df.index[edited_df['Välj']]]
                     
                     if selected_researchers:
                         # Spara forskarna i den temporära databasen
                         success = save_to_database(selected_researchers, engine=staging_engine)
                         if success:
-                            st.success(f"{len(selected_researchers)} forskare har lagts till i arbetsytan")
-                            # Rensa valda checkboxar
-                            for researcher in st.session_state['orcid_search_results']:
-                                orcid_id = researcher.get('orcid', f"noid_{st.session_state['orcid_search_results'].index(researcher)}")
-                                checkbox_key = f"orcid_select_{orcid_id}"
-                                if checkbox_key in st.session_state:
-                                    st.session_state[checkbox_key] = False
+                            st.session_state['orcid_flash'] = f"{len(selected_researchers)} forskare har lagts till i arbetsytan"
+                            # Nollställ valen i tabellen
+                            st.session_state.pop("orcid_editor", None)
+                            st.rerun()
                     else:
                         st.warning("Inga forskare valda")
         
@@ -2650,21 +2724,29 @@ def main():
             
             # Utför sökning om knappen klickas
             if pubmed_button and pubmed_query:
-                with st.spinner("Söker i PubMed..."):
-                    articles = search_pubmed(pubmed_query, 20)
-                    
-                    if articles:
-                        st.session_state['pubmed_results'] = articles
-                        st.success(f"Hittade {len(articles)} publikationer")
-                    else:
-                        st.warning("Inga publikationer hittades")
+                st.session_state['pubmed_job'] = _io_pool().submit(_pubmed_search_job, pubmed_query, 20)
+            
+            if job := _finished_job('pubmed_job'):
+                try:
+                    articles = job.result()
+                except Exception as e:
+                    st.error(f"Fel vid sökning i PubMed: {str(e)}")
+                    articles = []
+                
+                if articles:
+                    st.session_state['pubmed_results_df'] = pd.DataFrame(articles)
+                    st.success(f"Hittade {len(articles)} publikationer")
+                else:
+                    st.warning("Inga publikationer hittades")
+            
+            if 'pubmed_job' in st.session_state:
+                _wait_for_job('pubmed_job', "Söker i PubMed...")
             
             # Visa resultat om de finns
-            if 'pubmed_results' in st.session_state and st.session_state['pubmed_results']:
+            articles_df = st.session_state.get('pubmed_results_df')
+            if articles_df is not None and not articles_df.empty:
                 st.subheader("Sökresultat")
                 
-                # Skapa DataFrame med resultaten för bättre visning
-                articles_df = pd.DataFrame(st.session_state['pubmed_results'])
                 
                 if 'title' in articles_df.columns:
                     # Visa snyggare tabell med viktiga kolumner
@@ -2672,22 +2754,17 @@ def main():
                     formatted_df.columns = ['Titel', 'Författare', 'Journal', 'Publiceringsdatum', 'PMID']
                     st.dataframe(formatted_df, use_container_width=True)
                     
-                    # Visa detaljvy för en vald publikation
-                    selected_article = st.selectbox("Välj en publikation för att se detaljer:", 
-                                                   [article['title'] for article in st.session_state['pubmed_results']])
+                    # Visa detaljvy för en vald publikation. Valet är radens position, så
+                    # uppslaget blir ett direkt iloc och dubbletter av titlar hålls isär
+                    titles = articles_df['title'].tolist()
+                    selected_pos = st.selectbox("Välj en publikation för att se detaljer:", 
+                                                range(len(titles)), format_func=titles.__getitem__)
                     
-                    if selected_article:
-                        article = next(a for a in st.session_state['pubmed_results'] if a['title'] == selected_article)
-                        
-                        st.markdown(f"### {article['title']}")
-                        st.markdown(f"**Författare:** {article['authors']}")
-                        st.markdown(f"**Journal:** {article['journal']}")
-                        st.markdown(f"**Publiceringsdatum:** {article['publication_date']}")
-                        st.markdown(f"**PMID:** [{article['pmid']}](https://pubmed.ncbi.nlm.nih.gov/{article['pmid']}/)")
+                    if selected_pos is not None:
+                        article = articles_df.iloc[selected_pos]
                         
-                        if 'abstract' in article and article['abstract']:
-                            st.markdown("#### Abstract")
-                            st.markdown(article['abstract'])
+                        # Hela publikationen som ett enda markdown-element
+                        st.markdown(_article_markdown(article))
                         
                         # Lägg till knapp för att hitta författare
                         if st.button("Sök efter författare i ORCID"):
@@ -2752,22 +2829,39 @@ def main():
                 
                 if st.button("Processa fil"):
                     with st.spinner("Bearbetar Excel-fil..."):
-                        success, message, researchers = process_excel_file(uploaded_file)
+                        success, message, researchers = process_excel_file(uploaded_file.getvalue())
                         if success:
                             st.success(f"{message} ({len(researchers)} forskare)")
-                            
-                            # Visa en förhandsgranskning av data
-                            if researchers:
-                                st.subheader("Förhandsgranskning")
-                                preview_df = pd.DataFrame(researchers)
-                                st.dataframe(preview_df)
-                                
-                                if st.button("Bekräfta import"):
-                                    db_success = save_to_database(researchers, engine=staging_engine)
-                                    if db_success:
-                                        st.success(f"{len(researchers)} forskare har importerats till arbetsytan")
+                            # Spara resultatet så att förhandsgranskningen och
+                            # bekräftelseknappen finns kvar vid nästa omritning
+                            st.session_state['excel_import_df'] = pd.DataFrame(researchers)
                         else:
+                            st.session_state.pop('excel_import_df', None)
                             st.error(message)
+                
+                # Visa en förhandsgranskning av data
+                preview_df = st.session_state.get('excel_import_df')
+                if preview_df is not None and not preview_df.empty:
+                    st.subheader("Förhandsgranskning")
+                    st.dataframe(preview_df)
+                    
+                    # Kontrollera ORCID-formatet för hela kolumnen på en gång
+                    if 'orcid' in preview_df.columns:
+                        orcids = preview_df['orcid'].fillna('').astype(str)
+                        invalid_mask = (orcids != '') & ~orcids.str.fullmatch(_ORCID_RE.pattern)
+                        if invalid_mask.any():
+                            st.warning(f"{int(invalid_mask.sum())} forskare har ogiltigt ORCID-format: "
+                                       f"{', '.join(orcids[invalid_mask].head(10))}")
+                    
+                    if st.button("Bekräfta import"):
+                        try:
+                            antal = import_dataframe_to_staging(preview_df)
+                            st.session_state.pop('excel_import_df', None)
+                            st.success(f"{antal} forskare har importerats till arbetsytan")
+                        except Exception as e:
+                            st.error(f"Fel vid import till arbetsytan: {str(e)}")
+            else:
+                st.session_state.pop('excel_import_df', None)
 
 # Initiera session state variabler
 def initialize_session_state():
@@ -1,13 +1,29 @@
 import pandas as pd
+import openpyxl
 import os
 import logging
 import re
-from typing import Dict, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 # Konfigurera loggning
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Förkompilerade mönster för extract_researcher_data (anropas en gång per cell)
+_SPLIT_RE = re.compile(r';|\n')
+_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+')
+_NAME_AFF_RE = re.compile(r'(.+?)\s*\(([^)]+)\)')
+
+# Filtyper som list_available_files tar med
+EXCEL_EXTENSIONS = frozenset({'.xlsx', '.xls', '.csv'})
+
+def _file_extension(path: str) -> str:
+    """Filändelsen i gemener, t.ex. '.xlsx'."""
+    return os.path.splitext(path)[1].lower()
+
 class ExcelProcessor:
     """Klass för att hantera import av Excel-filer från olika källor och konvertera till Pandas DataFrame."""
     
@@ -18,10 +34,10 @@ class ExcelProcessor:
     
     def list_available_files(self) -> List[str]:
         """Listar alla tillgängliga Excel-filer i källkatalogen."""
-        excel_files = []
-        for file in os.listdir(self.source_directory):
-            if file.endswith(('.xlsx', '.xls', '.csv')):
-                excel_files.append(os.path.join(self.source_directory, file))
+        # scandir ger filtyp direkt från katalogposten, utan extra stat-anrop
+        with os.scandir(self.source_directory) as entries:
+            excel_files = [entry.path for entry in entries
+                           if entry.is_file() and _file_extension(entry.name) in EXCEL_EXTENSIONS]
         logger.info(f"Hittade {len(excel_files)} Excel-filer i källkatalogen")
         return excel_files
     
@@ -33,10 +49,15 @@ class ExcelProcessor:
         try:
             # Hoppa över första raden med skiprows=1
             kwargs.setdefault("skiprows", 1)
-            if file_path.endswith('.csv'):
+            if _file_extension(file_path) == '.csv':
                 df = pd.read_csv(file_path, **kwargs)
             else:
-                df = pd.read_excel(file_path, **kwargs)
+                # calamine (Rust) är betydligt snabbare än openpyxl; annars pandas standardmotor.
+                # ValueError: pandas äldre än 2.2 känner inte till calamine
+                try:
+                    df = pd.read_excel(file_path, engine='calamine', **kwargs)
+                except (ImportError, ValueError):
+                    df = pd.read_excel(file_path, **kwargs)
             
             logger.info(f"Läste in fil {file_path} med {len(df)} rader")
             return df
@@ -44,6 +65,27 @@ class ExcelProcessor:
             logger.error(f"Fel vid inläsning av {file_path}: {str(e)}")
             return None
 
+    def stream_excel_file(self, file_path: str, skiprows: int = 1) -> Iterator[Dict]:
+        """
+        Läser en .xlsx-fil rad för rad med openpyxl i read_only-läge och ger en dict per rad.
+        Precis som read_excel_file hoppas den första raden över och rubrikerna tas från rad 2,
+        men ingen DataFrame byggs och arbetsboken läses aldrig in i sin helhet.
+        """
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            for _ in range(skiprows):
+                next(rows, None)
+            header = next(rows, None)
+            if header is None:
+                return
+            # Samma namn som pandas ger kolumner utan rubrik
+            columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            for values in rows:
+                yield dict(zip(columns, values))
+        finally:
+            workbook.close()
+
     def extract_researcher_data(self, cell_text: Union[str, None], external_email: Optional[str] = None, pmid: Optional[str] = None) -> List[Dict]:
         """
         Extraherar forskardata från en cell med text som innehåller flera poster i formatet:
@@ -52,22 +94,25 @@ class ExcelProcessor:
         PMID bifogas till varje post.
         """
         entries = []
-        if not isinstance(cell_text, str):
+        # Tomma celler (eller bara blanksteg) behöver inte gå genom regexarna
+        if not isinstance(cell_text, str) or not cell_text.strip():
             return entries
         
         # Dela upp texten med semikolon eller radbrytningar
-        parts = [part.strip() for part in re.split(r';|\n', cell_text) if part.strip()]
+        parts = [part.strip() for part in _SPLIT_RE.split(cell_text) if part.strip()]
         
         for part in parts:
             # Försök hitta email i texten
-            email_match = re.search(r'[\w\.-]+@[\w\.-]+', part)
-            found_email = email_match.group(0) if email_match else external_email
-            # Ta bort email ur texten om den finns
-            if found_email:
-                part = part.replace(found_email, '')
+            email_match = _EMAIL_RE.search(part)
+            if email_match:
+                found_email = email_match.group(0)
+                # Ta bort email ur texten med matchens position, utan att söka igen
+                part = part[:email_match.start()] + part[email_match.end():]
+            else:
+                found_email = external_email
             
             # Leta efter mönstret "Namn (Affiliation)"
-            match = re.search(r'(.+?)\s*\(([^)]+)\)', part)
+            match = _NAME_AFF_RE.search(part)
             if match:
                 name = match.group(1).strip()
                 affiliation = match.group(2).strip()
@@ -89,8 +134,9 @@ class ExcelProcessor:
 
     def process_dataframe(self, df: pd.DataFrame, researcher_col: str = "X", pmid_col: str = "D", email_col: Optional[str] = None) -> pd.DataFrame:
         """
-        Bearbetar DataFrame genom att gå igenom varje rad, extrahera forskarinformation från en angiven kolumn 
+        Bearbetar DataFrame genom att extrahera forskarinformation från en angiven kolumn 
         (där det kan finnas flera poster) och lägga till PubMed ID från en annan kolumn.
+        Ger samma poster som extract_researcher_data för varje cell.
         
         Parametrar:
             researcher_col: Namnet på kolumnen där forskardata (text) finns (här kolumn X).
@@ -99,37 +145,120 @@ class ExcelProcessor:
             
         Returnerar en DataFrame med en post per forskare.
         """
+        output_columns = ["name", "affiliation", "email", "pmid"]
+        if researcher_col not in df.columns:
+            logger.info(f"Extraherade 0 forskarposter från DataFrame med {len(df)} rader")
+            return pd.DataFrame(columns=output_columns)
+        
+        # Hela kolumnen bearbetas med pandas str-metoder istället för en Python-loop per cell.
+        # Radnumret följer med som index så att varje post kan kopplas till radens PMID och email
+        cells = df[researcher_col].reset_index(drop=True)
+        cells = cells[cells.map(type) == str].astype(object)
+        
+        # Dela upp texten med semikolon eller radbrytningar, en del per rad
+        parts = cells.str.split(_SPLIT_RE).explode().str.strip()
+        parts = parts[parts != ""]
+        
+        # Första emailen i varje del plockas ut och tas bort ur texten
+        found_emails = parts.str.extract(f"({_EMAIL_RE.pattern})", expand=False)
+        parts = parts.str.replace(_EMAIL_RE, "", n=1, regex=True)
+        
+        # Mönstret "Namn (Affiliation)"; om inget mönster hittas blir hela texten namn
+        name_aff = parts.str.extract(_NAME_AFF_RE)
+        names = name_aff[0].str.strip().fillna(parts.str.strip())
+        affiliations = name_aff[1].str.strip()
+        
+        # Email från separat kolumn används där ingen email fanns inbäddad
+        if email_col and email_col in df.columns:
+            external_emails = df[email_col].reset_index(drop=True)
+            found_emails = found_emails.fillna(external_emails.reindex(parts.index))
+        # PMID från kolumn D, som text
+        if pmid_col in df.columns:
+            pmid_values = df[pmid_col].reset_index(drop=True)
+            pmids = pmid_values.astype(str).where(pmid_values.notna(), None).reindex(parts.index)
+        else:
+            pmids = None
+        
+        processed_df = pd.DataFrame({
+            "name": names,
+            "affiliation": affiliations,
+            "email": found_emails,
+            "pmid": pmids,
+        }, columns=output_columns).reset_index(drop=True)
+        logger.info(f"Extraherade {len(processed_df)} forskarposter från DataFrame med {len(df)} rader")
+        return processed_df
+
+    def process_rows(self, rows: Iterable[Dict], researcher_col: str = "X", pmid_col: str = "D", email_col: Optional[str] = None) -> pd.DataFrame:
+        """
+        Som process_dataframe, men för rader som dicts (t.ex. från stream_excel_file).
+        Tomma celler är None.
+        """
         processed_entries = []
+        row_count = 0
         
-        for index, row in df.iterrows():
-            # Hämta den stökiga cellen med forskardata från kolumn X
-            cell_text = row.get(researcher_col, "")
-            # Om email finns separat i en kolumn, sätt den; annars None
-            external_email = row.get(email_col) if email_col and pd.notna(row.get(email_col)) else None
-            # Hämta PMID från kolumn D
-            pmid = str(row.get(pmid_col)) if pmid_col in row and pd.notna(row.get(pmid_col)) else None
-            
-            researcher_entries = self.extract_researcher_data(cell_text, external_email=external_email, pmid=pmid)
+        for row in rows:
+            row_count += 1
+            external_email = row.get(email_col) if email_col else None
+            pmid = row.get(pmid_col)
+            researcher_entries = self.extract_researcher_data(
+                row.get(researcher_col),
+                external_email=external_email,
+                pmid=str(pmid) if pmid is not None else None
+            )
             processed_entries.extend(researcher_entries)
         
         processed_df = pd.DataFrame(processed_entries)
-        logger.info(f"Extraherade {len(processed_df)} forskarposter från DataFrame med {len(df)} rader")
+        logger.info(f"Extraherade {len(processed_df)} forskarposter från {row_count} rader")
         return processed_df
 
-    def process_batch(self, file_paths: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
-        """Bearbetar en batch av Excel-filer och returnerar dictionary med DataFrame för varje fil."""
-        result = {}
+    def process_file(self, file_path: str) -> Optional[pd.DataFrame]:
+        """Läser och bearbetar en fil; returnerar None om filen inte gick att läsa."""
+        # Använd kolumn X för forskardata och D för PubMed ID.
+        if _file_extension(file_path) == '.xlsx':
+            # .xlsx läses strömmande rad för rad, utan att gå via en DataFrame
+            try:
+                return self.process_rows(self.stream_excel_file(file_path), researcher_col="X", pmid_col="D", email_col=None)
+            except Exception as e:
+                logger.error(f"Fel vid inläsning av {file_path}: {str(e)}")
+                return None
+        
+        # Läs bara de kolumner som används, som text, så att pandas slipper typgissa.
+        # usecols som funktion så att en saknad kolumn inte ger fel
+        wanted = {"X", "D"}
+        df = self.read_excel_file(file_path, usecols=lambda col: col in wanted, dtype=str)
+        if df is None:
+            return None
+        return self.process_dataframe(df, researcher_col="X", pmid_col="D", email_col=None)
+
+    def iter_batch(self, file_paths: Optional[List[str]] = None, max_workers: Optional[int] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Bearbetar Excel-filer och ger (filnamn, DataFrame) för varje fil, i samma ordning som file_paths.
+        Flera filer bearbetas parallellt i separata processer (max_workers=1 kör allt i denna process).
+        """
         if file_paths is None:
             file_paths = self.list_available_files()
         
-        for file_path in file_paths:
-            df = self.read_excel_file(file_path)
-            if df is not None:
-                # Använd kolumn X för forskardata och D för PubMed ID.
-                processed_df = self.process_dataframe(df, researcher_col="X", pmid_col="D", email_col=None)
-                result[os.path.basename(file_path)] = processed_df
-        logger.info(f"Bearbetade {len(result)} av {len(file_paths)} Excel-filer")
-        return result
+        processed = 0
+        with ExitStack() as stack:
+            if len(file_paths) > 1 and max_workers != 1:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=max_workers))
+                results = executor.map(_process_file, repeat(self.source_directory), file_paths)
+            else:
+                results = map(self.process_file, file_paths)
+            
+            for file_path, processed_df in zip(file_paths, results):
+                if processed_df is not None:
+                    processed += 1
+                    yield os.path.basename(file_path), processed_df
+        logger.info(f"Bearbetade {processed} av {len(file_paths)} Excel-filer")
+
+    def process_batch(self, file_paths: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """Bearbetar en batch av Excel-filer och returnerar dictionary med DataFrame för varje fil."""
+        return dict(self.iter_batch(file_paths))
+
+def _process_file(source_directory: str, file_path: str) -> Optional[pd.DataFrame]:
+    """Bearbeta en fil i en arbetsprocess (på modulnivå så att den kan picklas)."""
+    return ExcelProcessor(source_directory).process_file(file_path)
 
 # Exempel på användning
 if __name__ == "__main__":
@@ -2,30 +2,56 @@ import pandas as pd
 import sqlite3
 import logging
 import os
-from typing import Dict, List, Optional, Any, Tuple
-import json
-import datetime
+import threading
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 
 # Konfigurera loggning
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _fetch_dicts(cursor: sqlite3.Cursor) -> List[Dict]:
+    """Hämta alla rader som dicts; kolumnnamnen läses en gång ur cursor.description."""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
 class PermanentDatabase:
     """Klass för att hantera interaktion med den permanenta databasen där godkänd data lagras."""
     
     def __init__(self, db_path: str):
         """Initiera databasanslutning till permanent databas."""
         self.db_path = db_path
+        # En anslutning per tråd (sqlite3-anslutningar får inte delas mellan trådar)
+        self._local = threading.local()
         
         # Skapa databasen och tabeller om de inte finns
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self._initialize_database()
         logger.info(f"PermanentDatabase initierad med databas på {db_path}")
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Hämta trådens anslutning till databasen. Den öppnas första gången och återanvänds
+        sedan, så schema och PRAGMA-inställningar läses inte in på nytt vid varje anrop.
+        Används som `with self._connect() as conn:`, vilket committar eller rullar tillbaka.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            # synchronous, temp_store, mmap och cache gäller per anslutning
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute("PRAGMA cache_size=-65536")
+            self._local.conn = conn
+        return conn
+    
     def _initialize_database(self):
         """Initiera databasen med nödvändiga tabeller."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
+                # WAL sparas i databasfilen, så det räcker att slå på det här
+                conn.execute("PRAGMA journal_mode=WAL")
+                
                 # Tabell för att lagra metadata om godkända dataset
                 conn.execute('''
                 CREATE TABLE IF NOT EXISTS datasets (
@@ -66,27 +92,39 @@ class PermanentDatabase:
                 )
                 ''')
                 
+                # Index för filtreringen i get_orcid_mappings och get_dataset_relationships.
+                # datasets(name, source) har redan ett index genom UNIQUE-villkoret
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_orcid_mappings_ds_orcid ON orcid_mappings(dataset_id, orcid)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_orcid_mappings_orcid ON orcid_mappings(orcid)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_dataset_relationships_source ON dataset_relationships(source_dataset_id)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_dataset_relationships_target ON dataset_relationships(target_dataset_id)")
+                
                 logger.info("Permanenta databastabeller initierade")
         except Exception as e:
             logger.error(f"Fel vid initiering av permanent databas: {str(e)}")
     
-    def store_dataframe(self, df: pd.DataFrame, table_name: str, source: str = None) -> int:
+    def store_dataframe(self, df: pd.DataFrame, table_name: str, source: str = None,
+                        chunksize: Optional[int] = None, method: Optional[str] = 'multi') -> int:
         """Lagra en godkänd dataframe i den permanenta databasen."""
         dataset_id = -1
         
         try:
             # Lagra data i databasen
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 # Registrera dataset
                 cursor = conn.cursor()
                 cursor.execute(
-                    "INSERT INTO datasets (name, source, approved_date, record_count) VALUES (?, ?, ?, ?)",
-                    (table_name, source, datetime.datetime.now().isoformat(), len(df))
+                    "INSERT INTO datasets (name, source, approved_date, record_count) VALUES (?, ?, CURRENT_TIMESTAMP, ?)",
+                    (table_name, source, len(df))
                 )
                 dataset_id = cursor.lastrowid
                 
                 # Lagra dataframe
-                df.to_sql(table_name, conn, if_exists='replace', index=False)
+                # Flerradiga INSERT; SQLite tillåter högst 999 parametrar per sats,
+                # så antalet rader per INSERT anpassas efter antalet kolumner
+                if chunksize is None:
+                    chunksize = max(1, 999 // max(1, len(df.columns)))
+                df.to_sql(table_name, conn, if_exists='replace', index=False, method=method, chunksize=chunksize)
                 logger.info(f"DataFrame lagrad i permanent databas, tabell {table_name} med {len(df)} rader")
                 
                 return dataset_id
@@ -97,8 +135,7 @@ class PermanentDatabase:
     def get_dataset_info(self, dataset_id: int = None) -> List[Dict]:
         """Hämta information om datasets i permanent databas."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 if dataset_id is not None:
@@ -106,7 +143,7 @@ class PermanentDatabase:
                 else:
                     cursor.execute("SELECT * FROM datasets ORDER BY approved_date DESC")
                 
-                return [dict(row) for row in cursor.fetchall()]
+                return _fetch_dicts(cursor)
         except Exception as e:
             logger.error(f"Fel vid hämtning av dataset-information från permanent databas: {str(e)}")
             return []
@@ -114,7 +151,7 @@ class PermanentDatabase:
     def register_orcid_mapping(self, dataset_id: int, record_id: str, orcid: str, confidence: float) -> bool:
         """Registrera en ORCID-koppling för en post i ett dataset."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "INSERT INTO orcid_mappings (dataset_id, record_id, orcid, match_confidence) VALUES (?, ?, ?, ?)",
@@ -130,31 +167,66 @@ class PermanentDatabase:
             logger.error(f"Fel vid registrering av ORCID-koppling: {str(e)}")
             return False
     
-    def get_orcid_mappings(self, dataset_id: int = None, orcid: str = None) -> List[Dict]:
-        """Hämta ORCID-kopplingar med filtrering på dataset-id eller ORCID."""
+    def register_orcid_mappings_bulk(self, dataset_id: int, mappings: List[Tuple[str, str, float]]) -> bool:
+        """Registrera flera ORCID-kopplingar (record_id, orcid, konfidens) för ett dataset i en transaktion."""
+        if not mappings:
+            return True
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect() as conn:
                 cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT INTO orcid_mappings (dataset_id, record_id, orcid, match_confidence) VALUES (?, ?, ?, ?)",
+                    [(dataset_id, record_id, orcid, confidence) for record_id, orcid, confidence in mappings]
+                )
                 
-                if dataset_id is not None and orcid is not None:
-                    cursor.execute("SELECT * FROM orcid_mappings WHERE dataset_id = ? AND orcid = ?", (dataset_id, orcid))
-                elif dataset_id is not None:
-                    cursor.execute("SELECT * FROM orcid_mappings WHERE dataset_id = ?", (dataset_id,))
-                elif orcid is not None:
-                    cursor.execute("SELECT * FROM orcid_mappings WHERE orcid = ?", (orcid,))
-                else:
-                    cursor.execute("SELECT * FROM orcid_mappings ORDER BY match_date DESC")
+                # Uppdatera dataset att det har ORCID-kopplingar
+                cursor.execute("UPDATE datasets SET orcid_linked = 1 WHERE id = ?", (dataset_id,))
                 
-                return [dict(row) for row in cursor.fetchall()]
+                logger.info(f"{len(mappings)} ORCID-kopplingar registrerade för dataset {dataset_id}")
+                return True
+        except Exception as e:
+            logger.error(f"Fel vid registrering av ORCID-kopplingar: {str(e)}")
+            return False
+    
+    def get_orcid_mappings(self, dataset_id: int = None, orcid: str = None) -> List[Dict]:
+        """Hämta ORCID-kopplingar med filtrering på dataset-id eller ORCID."""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(*self._orcid_mappings_query(dataset_id, orcid))
+                return _fetch_dicts(cursor)
         except Exception as e:
             logger.error(f"Fel vid hämtning av ORCID-kopplingar: {str(e)}")
             return []
     
+    def iter_orcid_mappings(self, dataset_id: int = None, orcid: str = None) -> Iterator[sqlite3.Row]:
+        """
+        Som get_orcid_mappings, men ger en sqlite3.Row i taget (åtkomst via index eller kolumnnamn)
+        istället för att bygga en lista med dicts. Passar när många kopplingar ska skrivas ut eller exporteras.
+        """
+        try:
+            cursor = self._connect().cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(*self._orcid_mappings_query(dataset_id, orcid))
+            yield from cursor
+        except Exception as e:
+            logger.error(f"Fel vid hämtning av ORCID-kopplingar: {str(e)}")
+    
+    @staticmethod
+    def _orcid_mappings_query(dataset_id: int = None, orcid: str = None) -> Tuple[str, Tuple]:
+        """SQL och parametrar för ORCID-kopplingar filtrerade på dataset-id och/eller ORCID."""
+        if dataset_id is not None and orcid is not None:
+            return "SELECT * FROM orcid_mappings WHERE dataset_id = ? AND orcid = ?", (dataset_id, orcid)
+        elif dataset_id is not None:
+            return "SELECT * FROM orcid_mappings WHERE dataset_id = ?", (dataset_id,)
+        elif orcid is not None:
+            return "SELECT * FROM orcid_mappings WHERE orcid = ?", (orcid,)
+        return "SELECT * FROM orcid_mappings ORDER BY match_date DESC", ()
+    
     def register_dataset_relationship(self, source_id: int, target_id: int, relationship_type: str) -> bool:
         """Registrera en relation mellan två datasets."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "INSERT INTO dataset_relationships (source_dataset_id, target_dataset_id, relationship_type) VALUES (?, ?, ?)",
@@ -170,8 +242,7 @@ class PermanentDatabase:
     def get_dataset_relationships(self, dataset_id: int = None) -> List[Dict]:
         """Hämta relationerna för ett specifikt dataset eller alla relationer."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 if dataset_id is not None:
@@ -182,7 +253,7 @@ class PermanentDatabase:
                 else:
                     cursor.execute("SELECT * FROM dataset_relationships")
                 
-                return [dict(row) for row in cursor.fetchall()]
+                return _fetch_dicts(cursor)
         except Exception as e:
             logger.error(f"Fel vid hämtning av dataset-relationer: {str(e)}")
             return []
@@ -190,7 +261,7 @@ class PermanentDatabase:
     def query_data(self, sql_query: str) -> Optional[pd.DataFrame]:
         """Kör en SQL-query mot den permanenta databasen och returnerar resultatet som DataFrame."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 df = pd.read_sql_query(sql_query, conn)
                 logger.info(f"SQL-query kördes med {len(df)} resultatrader")
                 return df
@@ -9,6 +9,11 @@ import os
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _fetch_dicts(cursor: sqlite3.Cursor) -> List[Dict]:
+    """Hämta alla rader som dicts; kolumnnamnen läses en gång ur cursor.description."""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
 class DataValidator:
     """Klass för att validera och normalisera dataframes innan de sparas i staging-databasen."""
     
@@ -123,7 +128,8 @@ class StagingDatabase:
         except Exception as e:
             logger.error(f"Fel vid initiering av databas: {str(e)}")
     
-    def store_dataframe(self, df: pd.DataFrame, table_name: str, schema_name: str = None) -> int:
+    def store_dataframe(self, df: pd.DataFrame, table_name: str, schema_name: str = None,
+                        chunksize: Optional[int] = None, method: Optional[str] = 'multi') -> int:
         """Validera och lagra en dataframe i staging-databasen."""
         dataset_id = -1
         
@@ -152,7 +158,11 @@ class StagingDatabase:
                     )
                 
                 # Lagra dataframe
-                df.to_sql(table_name, conn, if_exists='replace', index=False)
+                # Flerradiga INSERT; SQLite tillåter högst 999 parametrar per sats,
+                # så antalet rader per INSERT anpassas efter antalet kolumner
+                if chunksize is None:
+                    chunksize = max(1, 999 // max(1, len(df.columns)))
+                df.to_sql(table_name, conn, if_exists='replace', index=False, method=method, chunksize=chunksize)
                 logger.info(f"DataFrame lagrad i tabell {table_name} med {len(df)} rader")
                 
                 return dataset_id
@@ -164,7 +174,6 @@ class StagingDatabase:
         """Hämta information om datasets i staging-databasen."""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
                 if dataset_id is not None:
@@ -172,7 +181,7 @@ class StagingDatabase:
                 else:
                     cursor.execute("SELECT * FROM datasets ORDER BY import_date DESC")
                 
-                return [dict(row) for row in cursor.fetchall()]
+                return _fetch_dicts(cursor)
         except Exception as e:
             logger.error(f"Fel vid hämtning av dataset-information: {str(e)}")
             return []
@@ -181,10 +190,9 @@ class StagingDatabase:
         """Hämta valideringsfel för ett specifikt dataset."""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute("SELECT * FROM validation_errors WHERE dataset_id = ?", (dataset_id,))
-                return [dict(row) for row in cursor.fetchall()]
+                return _fetch_dicts(cursor)
         except Exception as e:
             logger.error(f"Fel vid hämtning av valideringsfel: {str(e)}")
             return []
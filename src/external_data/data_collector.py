@@ -9,6 +9,8 @@ from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from bs4 import BeautifulSoup
 import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Konfigurera loggning
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -50,17 +52,20 @@ class APIRateLimiter:
         """Initiera ratebegränsare med antal förfrågningar per sekund."""
         self.period = 1.0 / calls_per_second
         self.last_call_time = 0
+        # Låset gör att flera trådar kan dela på samma begränsare
+        self._lock = threading.Lock()
     
     def wait(self):
         """Vänta om nödvändigt för att respektera begränsningar."""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_call_time
-        
-        if time_since_last_call < self.period:
-            time_to_wait = self.period - time_since_last_call
-            time.sleep(time_to_wait)
-        
-        self.last_call_time = time.time()
+        with self._lock:
+            current_time = time.time()
+            time_since_last_call = current_time - self.last_call_time
+            
+            if time_since_last_call < self.period:
+                time_to_wait = self.period - time_since_last_call
+                time.sleep(time_to_wait)
+            
+            self.last_call_time = time.time()
 
 
 class PubMedCollector:
@@ -68,9 +73,12 @@ class PubMedCollector:
     
     def __init__(self, api_key: Optional[str] = None):
         """Initiera PubMed-konnektorn med API-nyckel om tillgänglig."""
-        self.api_key = api_key
+        self.api_key = api_key or os.environ.get("NCBI_API_KEY")
         self.base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
-        self.rate_limiter = APIRateLimiter(calls_per_second=3)  # PubMed har vanligtvis en begränsning på 3 förfrågningar/sekund
+        # NCBI tillåter 3 förfrågningar/sekund utan API-nyckel och 10 med
+        self.rate_limiter = APIRateLimiter(calls_per_second=10 if self.api_key else 3)
+        # Återanvänd anslutningen mellan esearch och efetch
+        self.session = requests.Session()
         logger.info("PubMed-konnektorn initierad")
     
     @retry()
@@ -84,18 +92,21 @@ class PubMedCollector:
                 "db": "pubmed",
                 "term": query,
                 "retmax": max_results,
-                "retmode": "json"
+                "retmode": "json",
+                # Spara träfflistan på NCBI:s history-server så att efetch kan referera till den
+                "usehistory": "y"
             }
             
             if self.api_key:
                 params["api_key"] = self.api_key
                 
-            response = requests.get(search_url, params=params)
+            response = self.session.get(search_url, params=params)
             response.raise_for_status()
             search_results = response.json()
             
             # Extrahera ID:n
-            id_list = search_results.get("esearchresult", {}).get("idlist", [])
+            esearch_result = search_results.get("esearchresult", {})
+            id_list = esearch_result.get("idlist", [])
             if not id_list:
                 logger.warning(f"Inga resultat hittades för sökningen: {query}")
                 return []
@@ -105,16 +116,28 @@ class PubMedCollector:
             # Steg 2: Använd efetch för att hämta detaljerad information
             self.rate_limiter.wait()
             fetch_url = f"{self.base_url}/efetch.fcgi"
-            params = {
-                "db": "pubmed",
-                "id": ",".join(id_list),
-                "retmode": "xml"
-            }
+            web_env = esearch_result.get("webenv")
+            query_key = esearch_result.get("querykey")
+            if web_env and query_key:
+                params = {
+                    "db": "pubmed",
+                    "WebEnv": web_env,
+                    "query_key": query_key,
+                    "retstart": 0,
+                    "retmax": max_results,
+                    "retmode": "xml"
+                }
+            else:
+                params = {
+                    "db": "pubmed",
+                    "id": ",".join(id_list),
+                    "retmode": "xml"
+                }
             
             if self.api_key:
                 params["api_key"] = self.api_key
                 
-            response = requests.get(fetch_url, params=params)
+            response = self.session.get(fetch_url, params=params)
             response.raise_for_status()
             
             # Bearbeta XML-respons
@@ -330,6 +353,8 @@ class OrcidClient:
         self.headers = {
             "Accept": "application/json"
         }
+        # Återanvänd TCP/TLS-anslutningen mot ORCID mellan anropen
+        self.session = requests.Session()
         
         if client_id and client_secret:
             self._get_token()
@@ -347,7 +372,7 @@ class OrcidClient:
                 "scope": "/read-public"
             }
             
-            response = requests.post(token_url, data=data)
+            response = self.session.post(token_url, data=data)
             response.raise_for_status()
             
             token_data = response.json()
@@ -387,7 +412,7 @@ class OrcidClient:
             self.rate_limiter.wait()
             
             url = f"{self.base_url}/{orcid}"
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers)
             response.raise_for_status()
             
             data = response.json()
@@ -813,12 +838,13 @@ class OrcidClient:
                 "rows": max_results
             }
             
-            response = requests.get(url, params=params, headers=self.headers)
+            response = self.session.get(url, params=params, headers=self.headers)
             response.raise_for_status()
             
             data = response.json()
             
             results = []
+            detail_ids = []
             for result in data.get("result", []):
                 # Extrahera ORCID ID först
                 orcid_id = result.get("orcid-identifier", {}).get("path")
@@ -857,8 +883,15 @@ class OrcidClient:
                     
                     results.append(researcher_info)
                 else:
-                    # För mindre sökningar, hämta fullständig information
-                    researcher_info = self.get_researcher_info(orcid_id)
+                    # För mindre sökningar hämtas fullständig information nedan
+                    detail_ids.append(orcid_id)
+            
+            if detail_ids:
+                # Hämta profilerna parallellt; rate_limiter delas mellan trådarna, så
+                # takten hålls medan ett anrops nätverkstid överlappar nästas väntan
+                with ThreadPoolExecutor(max_workers=len(detail_ids)) as executor:
+                    infos = list(executor.map(self.get_researcher_info, detail_ids))
+                for orcid_id, researcher_info in zip(detail_ids, infos):
                     if researcher_info:
                         # Lägg till både orcid_id och orcid för bakåtkompatibilitet
                         researcher_info["orcid_id"] = orcid_id
@@ -43,11 +43,10 @@ def process_excel_to_staging(excel_dir, staging_db_path, validation_rules_path=N
     
     # Initiera Excel-processor och läs filer
     processor = ExcelProcessor(excel_dir)
-    dataframes = processor.process_batch()
     
-    # Lagra varje dataframe i staging-databasen
+    # Lagra varje dataframe i staging-databasen, en fil i taget
     dataset_ids = []
-    for file_name, df in dataframes.items():
+    for file_name, df in processor.iter_batch():
         schema_name = Path(file_name).stem  # Använd filnamn utan ändelse som schema
         dataset_id = staging_db.store_dataframe(df, schema_name, schema_name)
         if dataset_id > 0:
@@ -111,8 +110,8 @@ def match_researchers_with_orcid(permanent_db_path, name_column, keywords_column
             logger.warning(f"Kolumnen '{name_column}' saknas i dataset '{dataset['name']}'")
             continue
         
-        # Bearbeta varje rad för att matcha forskare
-        match_count = 0
+        # Bearbeta varje rad för att matcha forskare; kopplingarna sparas i en omgång efteråt
+        mappings = []
         for idx, row in df.iterrows():
             name = row[name_column]
             if not name or pd.isna(name):
@@ -136,15 +135,14 @@ def match_researchers_with_orcid(permanent_db_path, name_column, keywords_column
                     record_id = str(row['id'])
                 
                 confidence = researcher.get('match_confidence', 0.5)
-                success = permanent_db.register_orcid_mapping(
-                    dataset['id'], record_id, researcher['orcid'], confidence
-                )
-                
-                if success:
-                    match_count += 1
-                    logger.info(f"Matchade '{name}' till ORCID: {researcher['orcid']}")
-                else:
-                    logger.error(f"Fel vid registrering av ORCID-koppling för '{name}'")
+                mappings.append((record_id, researcher['orcid'], confidence))
+                logger.info(f"Matchade '{name}' till ORCID: {researcher['orcid']}")
+        
+        match_count = 0
+        if permanent_db.register_orcid_mappings_bulk(dataset['id'], mappings):
+            match_count = len(mappings)
+        else:
+            logger.error(f"Fel vid registrering av ORCID-kopplingar för dataset '{dataset['name']}'")
         
         logger.info(f"Dataset '{dataset['name']}': Matchade {match_count} av {len(df)} forskare")
 